@@ -0,0 +1,88 @@
+#!/opt/bin/python3
+
+# Micro benchmark for the influxDB line encoder of the collectors
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Compares the schema based encoder with the former extractvar/assemblevar helpers
+# on a complete set of example answers. No FritzBox is needed.
+# Run with:
+# python3 benchmarkEncoder.py [NUMBER OF POLLS]
+
+import sys
+import timeit
+
+from fritzcollector import lineprotocol
+from fritzcollector.collectors import COLLECTORS, encoderow
+
+
+# The former helpers, kept here as reference
+def extractvar(answer, variable, integer=False, string=True, name=""):
+    if variable in answer.keys():
+        avar = str(answer[variable])
+        avar = avar.replace('"','')
+        if name == "":
+            name = variable
+        if integer:
+            avar = name + '=' + avar +'i' # format for integers in influxDB
+        else:
+            if string:
+                avar = name + '="' + avar +'"' # format for strings in influxDB
+            else:
+                avar = name + '=' + avar # format for float/double in influxDB
+    else:
+        avar = ''
+    return avar
+
+def assemblevar(*args):
+    data = ','.join(list(args))+','
+    #cleaning up output
+    data = data.replace("New", "")
+    data = data.replace(",,",",")
+    data = data.replace(",,",",")
+    data = data.replace(",,",",")
+    data = data.replace(",,",",")
+    data = data[:-1]
+    return data
+
+# The rows of all collectors that are defined by a metric table
+fritzRows = [row for collector in COLLECTORS.values() for row in collector.rows]
+fritzMetrics = [metric for collector in COLLECTORS.values() for metric in collector.metrics]
+
+def legacyrows(answers):
+    rows = []
+    for tag, fields in fritzRows:
+        values = []
+        for source, variable, prefix, fieldFormat in fields:
+            integer = fieldFormat is lineprotocol.formatinteger
+            string = fieldFormat is lineprotocol.formatstring
+            values.append(extractvar(answers[source], variable, integer, string, prefix[:-1]))
+        rows.append(assemblevar(*values))
+    return rows
+
+def encodedrows(answers):
+    return [','.join(encoderow(fields, answers)) for tag, fields in fritzRows]
+
+
+# Example answers with a value for every metric
+def exampleanswers():
+    answers = dict()
+    for tag, source, variable, name, fieldType in fritzMetrics:
+        if fieldType == lineprotocol.STRING:
+            value = 'Value of ' + name
+        else:
+            value = 1234567890
+        answers.setdefault(source, dict())[variable] = value
+    return answers
+
+
+if __name__ == '__main__':
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    answers = exampleanswers()
+    if legacyrows(answers) != encodedrows(answers):
+        print('Encoder output differs from the former helpers')
+        sys.exit(1)
+    for name, function in (('assemblevar/extractvar', legacyrows), ('encoderow', encodedrows)):
+        seconds = timeit.timeit(lambda: function(answers), number=polls)
+        print('%-25s %8.1f us per poll' % (name, seconds / polls * 1e6))
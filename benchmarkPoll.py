@@ -0,0 +1,115 @@
+#!/opt/bin/python3
+
+# Poll benchmark: the collectors of both scripts against recorded answers instead of a FritzBox
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Reports duration, requests and CPU time per poll. No FritzBox is needed, the answers are replayed
+# with the given latency per request from a made up box or from a fixture recorded from a real box.
+# Run with:
+# python3 benchmarkPoll.py [--latency SECONDS] [--polls NUMBER] [--hosts 200 --devices 40] [--fixture FILE]
+# Record a fixture (contains the MAC addresses, names and serial number of the box):
+# python3 benchmarkPoll.py --record FILE -i 192.168.178.1 -p PASSWORD
+
+from fritzconnection.core.fritzconnection import FRITZ_IP_ADDRESS
+from fritzcollector import replay
+from fritzcollector.box import FritzBox, WORKERS
+from fritzcollector.collectors import COLLECTORS, FRITZBOX_COLLECTORS
+import os
+import sys
+import time
+import argparse
+import statistics
+
+
+# Collectors of the scripts that are measured
+SCRIPTS = (
+    ('telegrafFritzBox.py', FRITZBOX_COLLECTORS),
+    ('telegrafFritzSmartHome.py', ('smarthome',)),
+)
+
+
+def getarguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixture', default='',
+                        help='recorded answers to replay. Default: a made up box with --hosts, --devices and --clients')
+    parser.add_argument('--hosts', type=int, default=200, help='hosts of the made up box. Default: 200')
+    parser.add_argument('--devices', type=int, default=40, help='smarthome devices of the made up box. Default: 40')
+    parser.add_argument('--clients', type=int, default=30, help='WLAN clients of the made up box. Default: 30')
+    parser.add_argument('--olderfirmware', action='store_true',
+                        help='leave out the xml downloads, every host and device is requested on its own')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds every request takes. Default: 0.02')
+    parser.add_argument('--polls', type=int, default=10, help='polls per measurement. Default: 10')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='concurrent requests. Default: %s' % WORKERS)
+    parser.add_argument('--daemon', action='store_true',
+                        help='keep the box between polls like --daemon does, otherwise every poll connects again')
+    parser.add_argument('--collectors', default='',
+                        help='comma separated list of collectors to measure in addition to the scripts')
+    parser.add_argument('--record', default='',
+                        help='poll a real FritzBox with all collectors and write its answers to this file')
+    parser.add_argument('-i', '--ip-address', default=os.getenv('FRITZ_IP_ADDRESS', FRITZ_IP_ADDRESS), dest='address')
+    parser.add_argument('--port', default=None)
+    parser.add_argument('-u', '--username', default=os.getenv('FRITZ_USERNAME', None))
+    parser.add_argument('-p', '--password', default=os.getenv('FRITZ_PASSWORD', None))
+    return parser.parse_args()
+
+def record(args):
+    box = FritzBox(args.address, args.address, args.username, args.password, args.port)
+    box.connect()
+    box.fc = replay.RecordingConnection(box.fc)
+    box.detectuplink() # again, to record it
+    box.run(list(COLLECTORS.values()))
+    if box.error:
+        print(box.error)
+        sys.exit(1)
+    replay.savefixture(args.record, box.fc.fixture)
+    print('Recorded %d actions and %d documents to %s' % (len(box.fc.fixture['actions']), len(box.fc.fixture['documents']), args.record))
+
+
+def measure(fixture, collectors, args):
+    # Duration, requests and CPU time of every poll
+    results = []
+    box = None
+    for n in range(args.polls):
+        start = time.perf_counter()
+        cpuStart = time.process_time()
+        if box is None or not args.daemon:
+            box = FritzBox('replay', 'replay')
+            box.fc = replay.ReplayConnection(fixture, args.latency)
+            box.detectuplink() # the part of connect() that talks to the box
+        callsStart = box.fc.calls
+        box.run(collectors, args.workers)
+        if box.error:
+            print('Poll failed: ' + box.error)
+            sys.exit(1)
+        results.append((time.perf_counter() - start, box.fc.calls - callsStart, time.process_time() - cpuStart, len(box.points)))
+    return results
+
+def printresults(name, results):
+    durations = [duration for duration, calls, cpu, lines in results]
+    calls = statistics.mean(calls for duration, calls, cpu, lines in results)
+    cpu = statistics.mean(cpu for duration, calls, cpu, lines in results)
+    lines = results[-1][3]
+    print('%-28s median %7.1f ms  max %7.1f ms  %6.1f requests  %6.1f ms CPU  %4d lines per poll'
+          % (name, statistics.median(durations) * 1e3, max(durations) * 1e3, calls, cpu * 1e3, lines))
+
+
+if __name__ == '__main__':
+    args = getarguments()
+    if args.record:
+        record(args)
+        sys.exit(0)
+    if args.fixture:
+        fixture = replay.loadfixture(args.fixture)
+    else:
+        fixture = replay.examplefixture(args.hosts, args.devices, args.clients)
+    if args.olderfirmware:
+        fixture = replay.withoutdocuments(fixture)
+    scripts = list(SCRIPTS)
+    if args.collectors:
+        names = [name.strip() for name in args.collectors.split(',') if name.strip()]
+        scripts.append(('--collectors ' + ','.join(names), names))
+    print('%d polls, %.0f ms per request, %d workers%s' % (args.polls, args.latency * 1e3, args.workers, ', daemon' if args.daemon else ''))
+    for name, collectorNames in scripts:
+        printresults(name, measure(fixture, [COLLECTORS[collector] for collector in collectorNames], args))
@@ -0,0 +1,46 @@
+#!/opt/bin/python3
+
+# Startup benchmark: connection setup with and without the cached TR-064 service descriptions
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Needs a FritzBox and fritzconnection 1.10 or newer for the cache.
+# Run with:
+# python3 benchmarkStartup.py -i 192.168.178.1 -p PASSWORD [--descriptioncache DIRECTORY]
+
+from fritzcollector import cli
+from fritzcollector.box import FritzBox, CACHE_SUPPORTED
+import sys
+import time
+import tempfile
+
+
+RUNS = 5 # Connections per measurement
+
+
+def timeconnect(box):
+    start = time.monotonic()
+    box.fc = None
+    box.connect()
+    return time.monotonic() - start
+
+def measure(box):
+    times = [timeconnect(box) for n in range(RUNS)]
+    return min(times), sum(times) / len(times)
+
+
+if __name__ == '__main__':
+    args = cli.getarguments(())
+    if not CACHE_SUPPORTED:
+        print('The description cache needs fritzconnection 1.10 or newer')
+        sys.exit(1)
+    cacheDirectory = args.descriptioncache or tempfile.mkdtemp()
+    for box in cli.getboxes(args):
+        cold = FritzBox(box.name, box.address, box.user, box.password, box.port)
+        warm = FritzBox(box.name, box.address, box.user, box.password, box.port, cacheDirectory=cacheDirectory)
+        warm.connect() # fills the cache
+        print(box.name)
+        for name, measuredBox in (('cold (no cache)', cold), ('warm (cached)', warm)):
+            best, mean = measure(measuredBox)
+            print('  %-16s best %6.3fs  mean %6.3fs' % (name, best, mean))
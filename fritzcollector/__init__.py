@@ -0,0 +1,4 @@
+# Shared parts of the FritzBox collectors for Telegraf.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
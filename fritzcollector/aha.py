@@ -0,0 +1,106 @@
+# Access to the AVM Home Automation HTTP interface (AHA) of a FritzBox.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# The AHA interface answers with one xml document for all smarthome devices, where TR-064 needs
+# one request per device. It needs a session id from the web login of the box:
+# https://avm.de/fileadmin/user_upload/Global/Service/Schnittstellen/AHA-HTTP-Interface.pdf
+# https://avm.de/fileadmin/user_upload/Global/Service/Schnittstellen/AVM_Technical_Note_-_Session_ID_english_2021-05-03.pdf
+
+import sys
+import hashlib
+import requests
+from xml.etree import ElementTree
+
+
+LOGIN_URL = '/login_sid.lua'
+AHA_URL = '/webservices/homeautoswitch.lua'
+INVALID_SID = '0000000000000000'
+
+
+class AhaError(Exception):
+    pass
+
+
+# Answer to the login challenge, PBKDF2 since FritzOS 7.24 and MD5 before
+def challengeresponse(challenge, password):
+    if challenge.startswith('2$'):
+        iterations1, salt1, iterations2, salt2 = challenge.split('$')[1:5]
+        hash1 = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt1), int(iterations1))
+        hash2 = hashlib.pbkdf2_hmac('sha256', hash1, bytes.fromhex(salt2), int(iterations2))
+        return salt2 + '$' + hash2.hex()
+    md5 = hashlib.md5((challenge + '-' + password).encode('utf-16-le')).hexdigest()
+    return challenge + '-' + md5
+
+def login(box):
+    # Returns a session id, the user of the box is used or the last one that logged in to the web interface
+    url = box.fc.address + LOGIN_URL
+    with box.fc.session.get(url, params={'version': 2}, timeout=box.fc.timeout) as response:
+        if response.status_code == 404:
+            raise AhaError('the box has no AHA interface')
+        response.raise_for_status()
+        root = ElementTree.fromstring(response.content)
+    user = box.user or root.findtext('Users/User[@last="1"]') or ''
+    answer = challengeresponse(root.findtext('Challenge', ''), box.password or '')
+    with box.fc.session.get(url, params={'version': 2, 'username': user, 'response': answer}, timeout=box.fc.timeout) as response:
+        response.raise_for_status()
+        sid = ElementTree.fromstring(response.content).findtext('SID', INVALID_SID)
+    if sid == INVALID_SID:
+        raise AhaError('login to the AHA interface failed')
+    return sid
+
+def read(box, reader, fallback):
+    # Returns reader(box) or None if the AHA interface can not be used, fallback tells what is done instead
+    # Only a refused login (AhaError) turns the interface off for good, every failed login makes the box
+    # block logins for longer. Other errors skip the interface for this poll, timeouts are passed on.
+    if not box.useAha:
+        return None
+    try:
+        return reader(box)
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+        box.recordtimeout()
+        raise # the box does not answer at all, that is no reason to give up the AHA interface
+    except AhaError as e:
+        box.useAha = False
+        print(box.name + ': AHA interface not available, ' + fallback + ' (skip the login with --noaha): ' + str(e), file=sys.stderr)
+    except Exception as e:
+        print(box.name + ': AHA interface failed, ' + fallback + ' this poll: ' + str(e), file=sys.stderr)
+    return None
+
+def command(box, switchcmd, **parameters):
+    # Opens the answer of an AHA command as stream, logs in again once if the session expired
+    for attempt in range(2):
+        if not box.ahaSid:
+            box.ahaSid = login(box)
+        parameters.update(switchcmd=switchcmd, sid=box.ahaSid)
+        response = box.fc.session.get(box.fc.address + AHA_URL, params=parameters, timeout=box.fc.timeout, stream=True)
+        if response.status_code != 403:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return response
+        response.close()
+        box.ahaSid = ''
+    raise AhaError('the AHA interface refused the session')
+
+def getdevicelist(box):
+    # Yields every smarthome device as xml element, parsed while the list is downloaded
+    with command(box, 'getdevicelistinfos') as response:
+        for event, item in ElementTree.iterparse(response.raw):
+            if item.tag == 'device':
+                yield item
+                item.clear()
+
+def getdevicestats(box, ain):
+    # History the device keeps of its measurements, a list of (series, grid, newest, values):
+    # grid is the time between the values in seconds, newest the time of the first value (None before FritzOS 7.5x)
+    # and values the measurements newest first, None where the device did not measure
+    with command(box, 'getbasicdevicestats', ain=ain) as response:
+        root = ElementTree.parse(response.raw).getroot()
+    history = []
+    for series in root:
+        for stats in series.findall('stats'):
+            values = [None if value in ('', '-') else int(value) for value in (stats.text or '').split(',')]
+            newest = stats.get('datatime')
+            history.append((series.tag, int(stats.get('grid')), int(newest) if newest else None, values[:int(stats.get('count', len(values)))]))
+    return history
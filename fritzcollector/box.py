@@ -0,0 +1,298 @@
+# One FritzBox with its connection, shared by all collectors.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# This module requires the FritzConnection package
+# Install with:
+# pip3 install fritzconnection
+
+from fritzconnection import FritzConnection
+import requests
+from fritzcollector import lineprotocol
+import os
+import re
+import sys
+import time
+import shutil
+import inspect
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+FRITZBOX_ID = 'FritzBox' # Name of the InfluxDB database.
+WORKERS = 6 # Maximum number of concurrent requests to the FritzBox
+SCHEDULE_SLACK = 1 # Seconds a group may run early, so a slightly early tick does not delay it by a whole interval
+CACHE_SUPPORTED = 'use_cache' in inspect.signature(FritzConnection.__init__).parameters # fritzconnection 1.10 and newer
+
+# Circuit breaker, so a box that does not answer does not stall every poll with timeouts
+TRIP_TIMEOUTS = 3 # Timeouts since the last answer after which the remaining requests of a poll are not sent
+BREAKER_FAILURES = 3 # Failed polls in a row after which the box is left alone for a while
+BACKOFF = 30 # Seconds the box is left alone after BREAKER_FAILURES, doubled with every further failure
+BACKOFF_MAX = 300
+SLOW_LATENCY = 1.0 # Seconds the box may take to answer before the optional collectors are paused
+
+# Actions every poll needs, independent of the selected collectors
+DEVICE_INFO = ('DeviceInfo1', 'GetInfo') # also tells if the box answers at all
+FRITZ_INFO = ('LANHostConfigManagement1', 'GetInfo') # domain name for the host tag
+WAN_INFO = ('WANCommonIFC1', 'GetCommonLinkProperties')
+# Placeholder for the GetInfo action of the WAN connection service, which depends on the uplink
+CONNECTION_INFO = ('WANConnection', 'GetInfo')
+
+
+class BoxUnavailable(Exception):
+    pass
+
+
+class FritzBox:
+    def __init__(self, name, address, user=None, password=None, port=None, tagged=False, cacheDirectory=''):
+        self.name = name
+        self.address = address
+        self.user = user
+        self.password = password
+        self.port = port
+        self.tags = (('box', name),) if tagged else () # tells the boxes apart when more than one is polled
+        self.fc = None
+        self.cacheDirectory = ''
+        if cacheDirectory and CACHE_SUPPORTED:
+            # one directory per box, so a box can be invalidated without touching the others
+            self.cacheDirectory = os.path.join(cacheDirectory, re.sub(r'[^\w.-]', '_', address + '_' + str(port or '')))
+        self.hostName = ''
+        self.isDsl = True
+        self.aliases = {CONNECTION_INFO: ('WANPPPConnection1', 'GetInfo')} # placeholders and the actions they stand for
+        self.points = [] # output of the last poll as (measurement, tags, fields, timestamp), written by the sinks
+        self.error = '' # reason why the last poll failed
+        self.busy = False # a poll is still running
+        self.callTimes = dict() # Duration in seconds of the last call of every service action in this poll
+        self.callErrors = dict() # Failed calls of every service action in this poll
+        self.calls = 0 # TR-064 requests in this poll
+        self.callLock = threading.Lock()
+        self.slowCall = 0 # Calls that take longer (in seconds) are logged to stderr, 0 for off
+        self.runStart = 0 # Start of the current poll, see run()
+        self.connectTime = None # Duration of the connection setup, if there was one in this poll
+        self.hostCache = {'key': None, 'hosts': dict(), 'hits': 0, 'misses': 0} # Last host statistics, see HostsCollector
+        self.workers = WORKERS # concurrent requests of the current poll
+        self.answers = dict() # Last answer of every action, serves the groups that are not due, see poll()
+        self.lastRuns = dict() # Time of the last request of every group
+        self.dueTags = set() # Groups requested in the current poll
+        self.pollTime = 0 # Wall clock time the requests of the current poll were started
+        self.clients = dict() # WLAN clients that are output and when they were seen the last time, see ClientsCollector
+        self.counters = dict() # Previous time and value of every cumulative counter, see Collector.encodecounters()
+        self.timeouts = 0 # Requests that timed out in this poll since the last answer, guarded by callLock
+        self.breaker = {'failures': 0, 'retryAt': 0, 'latency': 0.0} # Failed polls in a row, when to try again and the usual answer time
+        self.history = dict() # Time of the newest value output of every smarthome device and series, see SmartHomeHistoryCollector
+        self.ahaSid = '' # session of the AHA interface, see aha.py
+        self.useAha = True # False after the AHA interface failed, the smarthome devices are read over TR-064
+
+    def connect(self):
+        #fc = FritzConnection(args) # Dosn't seem to work dirctly
+        if self.cacheDirectory:
+            # The service descriptions are read from the cache, checkcache() compares the firmware on every poll
+            os.makedirs(self.cacheDirectory, exist_ok=True)
+            self.fc = FritzConnection(address=self.address, user=self.user, password=self.password, port=self.port, timeout=2.0,
+                                      use_cache=True, verify_cache=False, cache_directory=self.cacheDirectory)
+        else:
+            self.fc = FritzConnection(address=self.address, user=self.user, password=self.password, port=self.port, timeout=2.0)
+        self.answers = dict() # request every group again after a reconnect
+        self.lastRuns = dict()
+        self.detectuplink()
+
+    def checkcache(self, deviceInfo):
+        # A firmware update may change the services, read the descriptions again if the cached version is outdated
+        # The full version like '154.07.29' is the last entry of the system info in the descriptions
+        if not self.cacheDirectory:
+            return True
+        firmware = deviceInfo.get('NewSoftwareVersion')
+        systemInfo = self.fc.device_manager.system_info
+        if firmware and systemInfo and firmware != systemInfo[-1]:
+            shutil.rmtree(self.cacheDirectory, ignore_errors=True)
+            return False
+        return True
+
+    def detectuplink(self):
+        # The default connection service is e.g. '1.WANPPPConnection.1' for DSL or '1.WANIPConnection.1' for cable and fiber
+        service = self.readfritz('Layer3Forwarding1', 'GetDefaultConnectionService').get('NewDefaultConnectionService', '')
+        if '.' in service:
+            self.aliases[CONNECTION_INFO] = (service.split('.', 1)[1].replace('.', ''), 'GetInfo')
+        accessType = self.readfritz(*WAN_INFO).get('NewWANAccessType', '')
+        self.isDsl = accessType in ('DSL', '') # keep the DSL statistics if the box does not tell
+
+    # Every request is timed, see StatsCollector
+    # Requests run concurrently, so the timeouts are counted under the lock: every timeout counts up,
+    # every answer of the box starts again at 0, errors the box answered with leave the count alone
+    def recordcall(self, call, start, failed=False, timedOut=False):
+        duration = time.monotonic() - start
+        with self.callLock:
+            self.callTimes[call] = duration
+            self.calls = self.calls +1
+            if failed:
+                self.callErrors[call] = self.callErrors.get(call, 0) +1
+            if timedOut:
+                self.timeouts = self.timeouts +1
+            elif not failed:
+                self.timeouts = 0
+        if self.slowCall and duration > self.slowCall:
+            print('%s: %s took %.3fs%s' % (self.name, call, duration, ' and failed' if failed else ''), file=sys.stderr)
+
+    def recordtimeout(self):
+        # A timeout of a request that is not made with callfritz, e.g. to the AHA interface
+        with self.callLock:
+            self.timeouts = self.timeouts +1
+
+    # Helper modules for reading variables
+    def callfritz(self, module, action, **arguments):
+        # Passes the exceptions on, the end of a table (IndexError) is not counted as error
+        # After TRIP_TIMEOUTS timeouts since the last answer the box is taken as gone and nothing is requested any more
+        if self.timeouts >= TRIP_TIMEOUTS:
+            raise BoxUnavailable('%d requests timed out since the last answer' % self.timeouts)
+        start = time.monotonic()
+        try:
+            answer = self.fc.call_action(module, action, **arguments)
+        except IndexError:
+            self.recordcall(module + '.' + action, start)
+            raise
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            self.recordcall(module + '.' + action, start, True, True)
+            raise
+        except:
+            self.recordcall(module + '.' + action, start, True)
+            raise
+        self.recordcall(module + '.' + action, start)
+        return answer
+
+    def readfritz(self, module, action, **arguments):
+        try:
+            return self.callfritz(module, action, **arguments)
+        except:
+            return dict() # return an empty dict in case of failure
+
+    def readfritzall(self, pool, calls):
+        # calls are (module, action) pairs, every call runs in the given thread pool
+        futures = {call: pool.submit(self.readfritz, *self.aliases.get(call, call)) for call in calls}
+        return {call: future.result() for call, future in futures.items()}
+
+    def printtimes(self):
+        for call, duration in sorted(self.callTimes.items()):
+            errors = self.callErrors.get(call)
+            print('%-55s %.3fs%s' % (call, duration, ' %d failed' % errors if errors else ''), file=sys.stderr)
+
+    def influxrow(self, measurement, tags, fields, timestamp=None):
+        fields = [field for field in fields if field]
+        if fields: # a line without fields is not valid
+            self.points.append((measurement, self.tags + tags, fields, timestamp))
+
+    # Groups (the source tag of a row) can be requested less often than every poll
+    # schedule is a list of (pattern, seconds), the first pattern that matches the tag counts
+    def isdue(self, tag, schedule, now):
+        interval = next((seconds for pattern, seconds in schedule if fnmatch.fnmatchcase(tag, pattern)), 0)
+        return tag not in self.lastRuns or now + SCHEDULE_SLACK >= self.lastRuns[tag] + interval
+
+    # Read the data of all collectors and output it as influxDB points
+    def poll(self, collectors, workers=WORKERS, schedule=()):
+        # Get FritzBox data so it isn't requested mutiple times, even if more than one collector needs it
+        # All actions are independent of each other, so they are requested concurrently
+        # Only the actions of the due groups are requested, the other groups are output from the last answers
+        # Collectors without metric rows are scheduled as a whole by their group and are left out of the polls they are not due
+        self.workers = workers
+        now = time.monotonic()
+        collectors = [collector for collector in collectors if not collector.group or self.isdue(collector.group, schedule, now)]
+        dueRows = [(collector, [row for row in collector.getrows(self) if self.isdue(row[0], schedule, now)]) for collector in collectors]
+        calls = dict.fromkeys([DEVICE_INFO, FRITZ_INFO])
+        for collector, rows in dueRows:
+            calls.update(dict.fromkeys(collector.getcalls(self, rows)))
+        self.pollTime = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            answers = dict(self.answers)
+            answers.update(self.readfritzall(pool, calls))
+        if not answers[DEVICE_INFO]:
+            return False # the box did not answer, do not output empty lines
+        self.hostName = answers[FRITZ_INFO].get('NewDomainName', self.hostName)
+        if not self.checkcache(answers[DEVICE_INFO]):
+            self.connect() # outdated descriptions, reconnect and refresh the cache
+        for collector, rows in dueRows:
+            if rows:
+                collector.collect(self, answers)
+        self.answers = answers
+        self.dueTags = {tag for collector, rows in dueRows for tag, fields in rows}
+        self.lastRuns.update((tag, now) for tag in self.dueTags)
+        self.lastRuns.update((collector.group, now) for collector in collectors if collector.group)
+        for collector in collectors:
+            collector.output(self, answers)
+        return True
+
+    # State of the circuit breaker as one line, instead of the partial output of a box that does not answer well
+    def statusrow(self, state, skipped=()):
+        fields = [lineprotocol.field('State', state, lineprotocol.STRING),
+                  lineprotocol.field('Failures', self.breaker['failures'], lineprotocol.INTEGER),
+                  lineprotocol.field('Latency', round(self.breaker['latency'], 4), lineprotocol.FLOAT)]
+        if self.breaker['retryAt'] > time.time():
+            fields.append(lineprotocol.field('NextTry', round(self.breaker['retryAt'] - time.time()), lineprotocol.INTEGER))
+        if skipped:
+            fields.append(lineprotocol.field('Skipped', ','.join(collector.name for collector in skipped), lineprotocol.STRING))
+        self.influxrow(FRITZBOX_ID, (('host', self.hostName), ('source', 'availability')), fields)
+
+    def failed(self):
+        # Leave the box alone for a while after too many failures, a bit longer every time
+        breaker = self.breaker
+        breaker['failures'] = breaker['failures'] +1
+        if breaker['failures'] >= BREAKER_FAILURES:
+            breaker['retryAt'] = time.time() + min(BACKOFF * 2**(breaker['failures'] - BREAKER_FAILURES), BACKOFF_MAX)
+        self.points = []
+        self.statusrow('down')
+
+    # Connects if needed and polls, reconnects after the box answers again
+    # After failures the box is only asked for its DeviceInfo until it answers, see the circuit breaker constants
+    def run(self, collectors, workers=WORKERS, schedule=()):
+        self.points = []
+        self.error = ''
+        self.callTimes = dict()
+        self.callErrors = dict()
+        self.calls = 0
+        self.timeouts = 0
+        self.runStart = time.monotonic()
+        self.connectTime = None
+        breaker = self.breaker
+        try:
+            if breaker['retryAt'] > time.time():
+                self.error = 'Fritzbox did not answer %d times, next try in %ds' % (breaker['failures'], round(breaker['retryAt'] - time.time()))
+                self.statusrow('open')
+                return
+            if self.fc is not None and breaker['failures']:
+                if not self.readfritz(*DEVICE_INFO): # probe
+                    self.error = 'Fritzbox does not answer'
+                    self.failed()
+                    return
+                self.fc = None # the box is back, it may have restarted with new firmware
+            if self.fc is None:
+                try:
+                    self.connect()
+                    self.connectTime = time.monotonic() - self.runStart
+                except Exception as e:
+                    self.error = 'Cannot connect to fritzbox: ' + str(e)
+                    self.failed()
+                    return
+            skipped = ()
+            if breaker['latency'] > SLOW_LATENCY: # the box is busy, only ask for the important things
+                skipped = [collector for collector in collectors if collector.optional]
+                collectors = [collector for collector in collectors if not collector.optional]
+            try:
+                polled = self.poll(collectors, workers, schedule)
+            except Exception as e:
+                self.error = 'Cannot read from fritzbox: ' + str(e)
+                polled = False
+            if self.timeouts >= TRIP_TIMEOUTS:
+                self.error = self.error or 'Fritzbox stopped answering'
+                polled = False
+            if not polled:
+                self.error = self.error or 'Fritzbox did not answer'
+                self.failed()
+                return
+            breaker['failures'] = 0
+            breaker['retryAt'] = 0
+            latency = self.callTimes.get(DEVICE_INFO[0] + '.' + DEVICE_INFO[1], breaker['latency'])
+            breaker['latency'] = (breaker['latency'] + latency) / 2 if breaker['latency'] else latency
+            if skipped:
+                self.statusrow('degraded', skipped)
+        finally:
+            self.busy = False
@@ -0,0 +1,330 @@
+# Command line, polling of all boxes and daemon mode of the collector scripts.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+from fritzconnection.core.fritzconnection import FRITZ_IP_ADDRESS
+from fritzcollector.box import FritzBox, WORKERS, CACHE_SUPPORTED
+from fritzcollector.collectors import COLLECTORS
+from fritzcollector import sinks
+import os
+import sys
+import time
+import json
+import argparse
+import configparser
+import threading
+
+
+BOX_TIMEOUT = 25 # Seconds to wait for a FritzBox before its output is left out of a poll
+
+
+# This script uses optionally the environment variables for authentification:
+# FRITZ_IP_ADDRESS  IP-address of the FritzBox (Default 169.254.1.1)
+# FRITZ_TCP_PORT    Port of the FritzBox (Default: 49000)
+# FRITZ_USERNAME    Fritzbox authentication username (Default: Admin)
+# FRITZ_PASSWORD    Fritzbox authentication password
+
+
+# Poll all boxes in parallel, a box that does not finish in time can not stall the others
+# Returns the number of boxes that answered and the number of lines output
+def pollboxes(boxes, collectors, args, outputs):
+    polled = 0
+    threads = []
+    for box in boxes:
+        if box.busy:
+            print(box.name + ': previous poll is still running', file=sys.stderr)
+            continue
+        box.busy = True
+        thread = threading.Thread(target=box.run, args=(collectors, args.workers, args.schedule), daemon=True)
+        thread.start()
+        threads.append((box, thread))
+    deadline = time.monotonic() + args.timeout
+    points = []
+    for box, thread in threads:
+        thread.join(max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(box.name + ': no answer within %gs' % args.timeout, file=sys.stderr)
+            continue
+        if box.error:
+            print(box.name + ': ' + box.error, file=sys.stderr)
+        else:
+            polled = polled +1
+        points.extend(box.points)
+        if args.timing:
+            box.printtimes()
+    for output in outputs:
+        output.write(points)
+    return polled, len(points)
+
+# State of the boxes that is kept between runs: option with the file name and attribute of the box
+STATE_FILES = (('hostcache', 'hostCache'), ('counterstate', 'counters'), ('clientstate', 'clients'), ('breakerstate', 'breaker'), ('historystate', 'history'))
+
+def loadstate(args, boxes):
+    for option, attribute in STATE_FILES:
+        filename = getattr(args, option)
+        if not filename:
+            continue
+        try:
+            with open(filename) as stateFile:
+                states = json.load(stateFile)
+            for box in boxes:
+                getattr(box, attribute).update(states.get(box.name, dict()))
+        except (OSError, ValueError, AttributeError):
+            pass # start with an empty state
+
+def savestate(args, boxes):
+    # A box that is still polled after --timeout changes its state while it is written, its state in the file is kept
+    busy = [box.name for box in boxes if box.busy]
+    for option, attribute in STATE_FILES:
+        filename = getattr(args, option)
+        if not filename:
+            continue
+        states = dict()
+        if busy:
+            try:
+                with open(filename) as stateFile:
+                    states = {name: state for name, state in json.load(stateFile).items() if name in busy}
+            except (OSError, ValueError, AttributeError):
+                pass
+        states.update((box.name, getattr(box, attribute)) for box in boxes if box.name not in busy)
+        try:
+            with open(filename, 'w') as stateFile:
+                json.dump(states, stateFile)
+        except OSError as e:
+            print('Cannot write ' + option + ' file: ' + str(e), file=sys.stderr)
+
+
+def getsinks(args):
+    outputs = []
+    for name in [name.strip() for name in args.output.split(',') if name.strip()]:
+        if name == 'stdout':
+            outputs.append(sinks.StdoutSink())
+        elif name == 'influx':
+            outputs.append(sinks.InfluxSink(args.influxurl, args.influxdb, args.influxtoken, args.influxorg, args.influxbucket,
+                                            args.influxuser, args.influxpassword, args.batchsize, args.buffersize))
+        elif name == 'prometheus':
+            if not args.daemon:
+                print('The prometheus output needs --daemon')
+                sys.exit(1)
+            outputs.append(sinks.PrometheusSink(args.prometheusport, args.prometheusaddress))
+        else:
+            print('Unknown output: ' + name)
+            print('Available outputs: stdout, influx, prometheus')
+            sys.exit(1)
+    return outputs
+
+
+# Intervals of the groups as 'general=3600,wlan_*=600', the first matching pattern counts
+def getschedule(text):
+    schedule = []
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        pattern, separator, seconds = item.partition('=')
+        try:
+            schedule.append((pattern.strip(), float(seconds)))
+        except ValueError:
+            raise argparse.ArgumentTypeError('expected GROUP=SECONDS instead of ' + repr(item))
+    return schedule
+
+
+# Connect to the FritzBox
+def printoptions(defaultCollectors):
+    print('Options:')
+    print('-i [ADDRESS],  IP-address of the FritzBox (Default 169.254.1.1), repeat for more than one box')
+    print('-p [PASSWORD], Fritzbox authentication password')
+    print('-u [USERNAME], Fritzbox authentication username (Default: Admin)')
+    print('--port [PORT], Port of the FritzBox (Default: 49000)')
+    print('-e [ENCRYPT],  Use secure connection (Default: Off)')
+    print('--config [FILE], Read the FritzBoxes to poll from this file (Default: Off)')
+    print('--timeout [SECONDS], Time to wait for every FritzBox (Default: %s)' % BOX_TIMEOUT)
+    print('--collectors [NAMES], Comma separated list of %s (Default: %s)' % (', '.join(COLLECTORS), ','.join(defaultCollectors)))
+    print('--clients [NUMBER], Maximum number of WLAN clients output by the clients collector, 0 for all (Default: 20)')
+    print('--clientallow [MACS], Comma separated MAC addresses, only output these WLAN clients (Default: all)')
+    print('--clientexpiry [SECONDS], Time after which a WLAN client that is gone frees its place (Default: 3600)')
+    print('--clientstate [FILE], Keep the WLAN clients that are output between runs in this file (Default: Off)')
+    print('--daemon,      Keep running and poll periodically (Default: Off)')
+    print('--interval [SECONDS], Poll interval in daemon mode (Default: 0 = poll on every line from stdin)')
+    print('--schedule [GROUP=SECONDS,...], Poll these groups less often in daemon mode, e.g. general=3600,wlan_*=600 (Default: every poll)')
+    print('--workers [NUMBER], Maximum number of concurrent requests per FritzBox (Default: %s)' % WORKERS)
+    print('--output [NAMES], Comma separated list of stdout, influx, prometheus (Default: stdout)')
+    print('--influxurl [URL], InfluxDB to write to with the influx output (Default: http://localhost:8086)')
+    print('--influxdb [NAME], InfluxDB 1.x database (Default: telegraf), --influxuser and --influxpassword if needed')
+    print('--influxtoken [TOKEN], InfluxDB 2.x token, with --influxorg and --influxbucket (Default: Off)')
+    print('--batchsize [NUMBER], Lines per write to InfluxDB (Default: %s)' % sinks.BATCH_SIZE)
+    print('--buffersize [NUMBER], Lines kept while InfluxDB can not be reached (Default: %s)' % sinks.BUFFER_SIZE)
+    print('--prometheusport [PORT], Port of the /metrics page of the prometheus output (Default: %s)' % sinks.PROMETHEUS_PORT)
+    print('--timing,      Print the duration of every request to stderr (Default: Off)')
+    print('--slowcall [SECONDS], Log every request to stderr that takes longer (Default: Off)')
+    print('--hostcache [FILE], Keep the host statistics between runs in this file (Default: Off)')
+    print('--noaha,       Read the smarthome devices over TR-064 only, for users without the smarthome permission (Default: Off)')
+    print('--counterstate [FILE], Keep the counters between runs in this file to output their change (Default: Off)')
+    print('--historystate [FILE], Keep the time of the smarthome history that is output between runs in this file (Default: Off)')
+    print('--breakerstate [FILE], Keep the failures of the boxes between runs in this file to back off (Default: Off)')
+    print('--descriptioncache [DIRECTORY], Keep the TR-064 service descriptions in this directory (Default: Off)')
+    print()
+    print('Hint: if this script is not working often IP or password is missing')
+
+def getarguments(defaultCollectors):
+    # The options of fritzconnection, but -i can be given more than once
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', '--ip-address', action='append', default=[], dest='addresses',
+                        help='ip-address of a FritzBox to connect to, repeat for more than one box. '
+                             'Default: %s' % FRITZ_IP_ADDRESS)
+    parser.add_argument('--port', nargs='?', default=None, const=None,
+                        help='port of the FritzBox to connect to. Default: 49000')
+    parser.add_argument('-u', '--username', nargs='?', default=os.getenv('FRITZ_USERNAME', None),
+                        help='Fritzbox authentication username')
+    parser.add_argument('-p', '--password', nargs='?', default=os.getenv('FRITZ_PASSWORD', None),
+                        help='Fritzbox authentication password')
+    parser.add_argument('-e', '--encrypt', nargs='?', default=False, const=True,
+                        help='use secure connection')
+    parser.add_argument('--config', default='',
+                        help='file with one section per FritzBox (address, username, password, port), '
+                             'the section name is used as box tag')
+    parser.add_argument('--timeout', type=float, default=BOX_TIMEOUT,
+                        help='seconds to wait for every FritzBox before its output is left out. Default: %s' % BOX_TIMEOUT)
+    parser.add_argument('--collectors', default=','.join(defaultCollectors),
+                        help='comma separated list of the collectors to run: %s. Default: %s' % (', '.join(COLLECTORS), ','.join(defaultCollectors)))
+    parser.add_argument('--clients', type=int, default=20,
+                        help='maximum number of WLAN clients output by the clients collector, '
+                             'the ones with the fastest link first. 0 for no limit. Default: 20')
+    parser.add_argument('--clientallow', default='',
+                        help='comma separated MAC addresses, only these WLAN clients are output. Default: all')
+    parser.add_argument('--clientexpiry', type=float, default=3600,
+                        help='seconds after which a WLAN client that is gone frees its place for another one. Default: 3600')
+    parser.add_argument('--clientstate', default='',
+                        help='file to keep the WLAN clients that are output in between runs, '
+                             'so --clients and --clientexpiry work without --daemon')
+    parser.add_argument('--daemon', action='store_true',
+                        help='keep the connection open and poll periodically')
+    parser.add_argument('--interval', type=float, default=0,
+                        help='poll interval in seconds for the daemon mode. '
+                             'Default: 0 (poll on every line read from stdin, as sent by the telegraf execd plugin)')
+    parser.add_argument('--schedule', type=getschedule, default=[],
+                        help='comma separated intervals in seconds of the groups (source tag of the rows) in daemon mode, '
+                             'e.g. general=3600,dsl=300,wlan_*=600. In between the last answers are output. Default: every poll')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='maximum number of concurrent requests to every FritzBox. Default: %s' % WORKERS)
+    parser.add_argument('--output', default='stdout',
+                        help='comma separated list of the outputs: stdout (for Telegraf), influx (write to InfluxDB), '
+                             'prometheus (serve /metrics, needs --daemon). Default: stdout')
+    parser.add_argument('--influxurl', default='http://localhost:8086', help='url of InfluxDB. Default: http://localhost:8086')
+    parser.add_argument('--influxdb', default='telegraf', help='InfluxDB 1.x database. Default: telegraf')
+    parser.add_argument('--influxuser', default='', help='InfluxDB 1.x user')
+    parser.add_argument('--influxpassword', default=os.getenv('INFLUX_PASSWORD', ''), help='InfluxDB 1.x password')
+    parser.add_argument('--influxtoken', default=os.getenv('INFLUX_TOKEN', ''), help='InfluxDB 2.x token, selects the 2.x API')
+    parser.add_argument('--influxorg', default='', help='InfluxDB 2.x organization')
+    parser.add_argument('--influxbucket', default='telegraf', help='InfluxDB 2.x bucket. Default: telegraf')
+    parser.add_argument('--batchsize', type=int, default=sinks.BATCH_SIZE,
+                        help='lines per write request to InfluxDB. Default: %s' % sinks.BATCH_SIZE)
+    parser.add_argument('--buffersize', type=int, default=sinks.BUFFER_SIZE,
+                        help='lines kept for the next try while InfluxDB can not be reached. Default: %s' % sinks.BUFFER_SIZE)
+    parser.add_argument('--prometheusport', type=int, default=sinks.PROMETHEUS_PORT,
+                        help='port of the /metrics page of the prometheus output. Default: %s' % sinks.PROMETHEUS_PORT)
+    parser.add_argument('--prometheusaddress', default='', help='address to serve the /metrics page on. Default: all')
+    parser.add_argument('--timing', action='store_true',
+                        help='print the duration of every request to stderr')
+    parser.add_argument('--slowcall', type=float, default=0,
+                        help='log every request that takes longer than this many seconds to stderr. Default: 0 (off)')
+    parser.add_argument('--hostcache', default='',
+                        help='file to keep the host statistics in between runs, '
+                             'only read the host table again after it changed')
+    parser.add_argument('--noaha', action='store_true',
+                        help='do not log in to the AHA interface, read the smarthome devices over TR-064 only. '
+                             'For users without the smarthome permission, every run of the normal mode would try the login again')
+    parser.add_argument('--counterstate', default='',
+                        help='file to keep the last values of the counters in between runs, '
+                             'so their change and rate can be output without --daemon')
+    parser.add_argument('--historystate', default='',
+                        help='file to keep the time of the newest smarthome history value of every device in between runs, '
+                             'so only the values that are new are output without --daemon')
+    parser.add_argument('--breakerstate', default='',
+                        help='file to keep the failed polls of every box in between runs, '
+                             'so a box that does not answer is left alone for a while without --daemon')
+    parser.add_argument('--descriptioncache', default='',
+                        help='directory to keep the TR-064 service descriptions in, '
+                             'they are read again after a firmware update (needs fritzconnection 1.10 or newer)')
+    return parser.parse_args()
+
+def getcollectors(args):
+    names = [name.strip() for name in args.collectors.split(',') if name.strip()]
+    unknown = [name for name in names if name not in COLLECTORS]
+    if unknown or not names:
+        print('Unknown collectors: ' + ', '.join(unknown))
+        print('Available collectors: ' + ', '.join(COLLECTORS))
+        sys.exit(1)
+    collectors = [collector for name, collector in COLLECTORS.items() if name in names] # stats has to be last
+    for collector in collectors:
+        collector.configure(args)
+    return collectors
+
+def getboxes(args):
+    # Boxes from the config file first, then the ones given with -i
+    boxes = []
+    tagged = bool(args.config) or len(args.addresses) > 1
+    if args.config:
+        config = configparser.ConfigParser(interpolation=None)
+        if not config.read(args.config):
+            print('Cannot read config file ' + args.config)
+            sys.exit(1)
+        for name in config.sections():
+            section = config[name]
+            boxes.append(FritzBox(name, section.get('address', FRITZ_IP_ADDRESS), section.get('username', args.username),
+                                  section.get('password', args.password), section.get('port', args.port), tagged, args.descriptioncache))
+    for address in args.addresses:
+        boxes.append(FritzBox(address, address, args.username, args.password, args.port, tagged, args.descriptioncache))
+    if not boxes:
+        boxes.append(FritzBox(FRITZ_IP_ADDRESS, FRITZ_IP_ADDRESS, args.username, args.password, args.port, False, args.descriptioncache))
+    for box in boxes:
+        box.slowCall = args.slowcall
+        box.useAha = not args.noaha
+    return boxes
+
+
+# Keep the connection open and poll on every tick, reconnect only after a failure
+def waittick(interval, lastTick):
+    if interval > 0:
+        time.sleep(max(0, lastTick + interval - time.monotonic()))
+        return True
+    return sys.stdin.readline() != '' # Telegraf execd sends a newline on every interval, EOF on shutdown
+
+def daemon(boxes, collectors, args, outputs):
+    lastTick = time.monotonic() - args.interval # poll right away on start
+    while waittick(args.interval, lastTick):
+        lastTick = time.monotonic()
+        pollboxes(boxes, collectors, args, outputs)
+        savestate(args, boxes)
+
+
+def main(defaultCollectors):
+    args = getarguments(defaultCollectors)
+    collectors = getcollectors(args)
+    boxes = getboxes(args)
+    if not all(box.password for box in boxes):
+        print('Password required.')
+        print()
+        printoptions(defaultCollectors)
+        sys.exit(1)
+    if args.descriptioncache and not CACHE_SUPPORTED:
+        print('The description cache needs fritzconnection 1.10 or newer, connecting without it', file=sys.stderr)
+    loadstate(args, boxes)
+    outputs = getsinks(args)
+    if args.daemon:
+        try:
+            daemon(boxes, collectors, args, outputs)
+        finally:
+            for output in outputs:
+                output.close()
+        sys.exit(0)
+    polled, lines = pollboxes(boxes, collectors, args, outputs)
+    for output in outputs:
+        output.close()
+    savestate(args, boxes)
+    if not polled and not lines: # the status lines of boxes that do not answer are output, Telegraf drops them on failure
+        if len(boxes) == 1:
+            print("Cannot connect to fritzbox. ")
+            print()
+            printoptions(defaultCollectors)
+        sys.exit(1)
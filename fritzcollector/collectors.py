@@ -0,0 +1,586 @@
+# The collectors, each one outputs a group of influxDB lines for a FritzBox.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+from fritzcollector import lineprotocol, aha
+from fritzcollector.box import FRITZBOX_ID, DEVICE_INFO, FRITZ_INFO, WAN_INFO, CONNECTION_INFO
+from fritzcollector.lineprotocol import INTEGER, FLOAT, STRING
+from fritzconnection.core.exceptions import FritzActionError, FritzServiceError
+import sys
+import time
+import itertools
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+
+SMARTHOME_ID = 'FritzBoxSmartHome' # Name of the InfluxDB database for the smarthome devices.
+
+# Sources of the metrics: TR-064 service and action
+TRAFFIC_INFO = ('WANCommonIFC1', 'GetAddonInfos')
+DSL_INFO = ('WANDSLInterfaceConfig1', 'GetInfo')
+DSL_ERROR = ('WANDSLInterfaceConfig1', 'GetStatisticsTotal')
+DHCP_INFO = ('Hosts1', 'GetHostNumberOfEntries')
+CHANGE_INFO = ('Hosts1', 'X_AVM-DE_GetChangeCounter')
+LAN_STAT = ('LANEthernetInterfaceConfig1', 'GetStatistics')
+WLAN_STAT_24 = ('WLANConfiguration1', 'GetStatistics')
+WLAN_STAT_50 = ('WLANConfiguration2', 'GetStatistics')
+WLAN_STAT_GUEST = ('WLANConfiguration3', 'GetStatistics')
+WLAN_INFO_24 = ('WLANConfiguration1', 'GetInfo')
+WLAN_INFO_50 = ('WLANConfiguration2', 'GetInfo')
+WLAN_INFO_GUEST = ('WLANConfiguration3', 'GetInfo')
+WLAN_ASSOC_24 = ('WLANConfiguration1', 'GetTotalAssociations')
+WLAN_ASSOC_50 = ('WLANConfiguration2', 'GetTotalAssociations')
+WLAN_ASSOC_GUEST = ('WLANConfiguration3', 'GetTotalAssociations')
+WLAN_LIST_24 = ('WLANConfiguration1', 'X_AVM-DE_GetWLANDeviceListPath')
+WLAN_LIST_50 = ('WLANConfiguration2', 'X_AVM-DE_GetWLANDeviceListPath')
+WLAN_LIST_GUEST = ('WLANConfiguration3', 'X_AVM-DE_GetWLANDeviceListPath')
+# Sources that are assembled by the collectors themselves and not requested as a single action
+FIRMWARE_INFO = ('FritzConnection', 'system_version')
+HOST_INFO = ('Hosts1', 'gethosts')
+LOCAL_SOURCES = (FIRMWARE_INFO, HOST_INFO)
+
+
+# Helper modules for the metric tables
+def compileschema(metrics):
+    # Groups the metrics into one list of fields per output line, keeping the order of the lines
+    rows = dict()
+    for tag, source, variable, name, fieldType in metrics:
+        rows.setdefault(tag, []).append((source, variable, lineprotocol.escapekey(name) + '=', lineprotocol.FORMATS[fieldType]))
+    return [(tag, tuple(fields)) for tag, fields in rows.items()]
+
+def compilecounters(metrics, counters):
+    # The cumulative counters of every row with source, variable, field name and bits
+    sources = {(tag, name): (source, variable) for tag, source, variable, name, fieldType in metrics}
+    rows = dict()
+    for tag, name, bits in counters:
+        rows.setdefault(tag, []).append(sources[(tag, name)] + (name, bits))
+    return rows
+
+def encoderow(fields, answers):
+    # All fields of one line in a single pass, missing variables and invalid values are left out
+    values = [(prefix, fieldFormat(answers[source][variable])) for source, variable, prefix, fieldFormat in fields if variable in answers[source]]
+    return [prefix + value for prefix, value in values if value is not None]
+
+def readitems(box, path):
+    # A list of the box as one xml document, parsed while it is downloaded. Yields every entry as dict
+    url = box.fc.address + ':' + str(box.fc.port) + path
+    with box.fc.session.get(url, timeout=box.fc.timeout, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        for event, item in ElementTree.iterparse(response.raw):
+            if item.tag == 'Item':
+                yield {child.tag: child.text for child in item}
+                item.clear()
+
+
+# A collector lists its metrics as table: source tag, TR-064 source, variable in the answer, field name, type.
+# Cumulative counters among them are listed in a second table: source tag, field name, bits of the counter.
+# The box requests the actions of the rows that are due together, then every collector with
+# due rows may add its own answers in collect() and all collectors output their lines in output().
+class Collector:
+    name = ''
+    measurement = FRITZBOX_ID
+    metrics = ()
+    counters = ()
+    optional = False # paused while the box answers slowly, see the circuit breaker in box.py
+    group = '' # name for --schedule of a collector without metric rows, it is run as a whole when due
+
+    def __init__(self):
+        self.rows = compileschema(self.metrics)
+        self.counterRows = compilecounters(self.metrics, self.counters)
+
+    def getrows(self, box):
+        return self.rows
+
+    def getcalls(self, box, rows):
+        return [source for tag, fields in rows for source, *field in fields if source not in LOCAL_SOURCES]
+
+    def configure(self, args):
+        pass # options of the command line that are specific to the collector
+
+    def collect(self, box, answers):
+        pass
+
+    # Change of the counters since the previous request and per second, so the dashboards do not need derivative()
+    # The previous values are kept in box.counters, see --counterstate for the state between runs
+    def encodecounters(self, box, tag, answers):
+        values = []
+        now = box.pollTime
+        upTime = answers[DEVICE_INFO].get('NewUpTime')
+        for source, variable, name, bits in self.counterRows[tag]:
+            try:
+                value = int(answers[source][variable])
+            except (KeyError, TypeError, ValueError):
+                continue
+            key = tag + '.' + name
+            previous = box.counters.get(key)
+            box.counters[key] = [now, value]
+            if previous is None:
+                continue
+            elapsed = now - previous[0]
+            if elapsed <= 0 or (upTime is not None and int(upTime) < elapsed):
+                continue # the box restarted since the previous value, all counters started again at 0
+            delta = value - previous[1]
+            if delta < 0:
+                # A counter that was near its end and is small again ran over. Any other drop is a reset,
+                # e.g. the WLAN was switched off, and a 64 bit counter does not run over at all
+                if bits < 64 and previous[1] >= 2**(bits -1) and value < 2**(bits -1):
+                    delta = delta + 2**bits
+                else:
+                    continue
+            values.append(lineprotocol.field(name + 'Delta', delta, INTEGER))
+            values.append(lineprotocol.field(name + 'Rate', round(delta / elapsed, 3), FLOAT))
+        return values
+
+    def output(self, box, answers):
+        for tag, fields in self.getrows(box):
+            values = encoderow(fields, answers)
+            if tag in self.counterRows and tag in box.dueTags: # rows from the last answers have not changed
+                values = values + self.encodecounters(box, tag, answers)
+            box.influxrow(self.measurement, (('host', box.hostName), ('source', tag)), values)
+
+
+class SystemCollector(Collector):
+    name = 'system'
+    metrics = (
+        # General Fritzbox information
+        ('general', DEVICE_INFO, 'NewModelName', 'ModelName', STRING),
+        ('general', WAN_INFO, 'NewWANAccessType', 'WANAccessType', STRING),
+        ('general', DEVICE_INFO, 'NewSerialNumber', 'SerialNumber', STRING),
+        ('general', FIRMWARE_INFO, 'Firmware', 'Firmware', STRING),
+        # Connection Information
+        ('status', DEVICE_INFO, 'NewUpTime', 'UpTime', INTEGER),
+        ('status', CONNECTION_INFO, 'NewConnectionStatus', 'ConnectionStatus', STRING),
+        ('status', CONNECTION_INFO, 'NewLastConnectionError', 'LastError', STRING),
+    )
+
+    def collect(self, box, answers):
+        answers[FIRMWARE_INFO] = {'Firmware': box.fc.device_manager.system_version}
+
+
+class WanCollector(Collector):
+    name = 'wan'
+    metrics = (
+        ('wan', CONNECTION_INFO, 'NewUptime', 'ConnectionTime', INTEGER),
+        ('wan', WAN_INFO, 'NewLayer1DownstreamMaxBitRate', 'Layer1DownstreamMaxBitRate', INTEGER),
+        ('wan', WAN_INFO, 'NewLayer1UpstreamMaxBitRate', 'Layer1UpstreamMaxBitRate', INTEGER),
+        # Traffic information
+        ('wan', TRAFFIC_INFO, 'NewByteReceiveRate', 'ByteReceiveRate', INTEGER),
+        ('wan', TRAFFIC_INFO, 'NewByteSendRate', 'ByteSendRate', INTEGER),
+        ('wan', TRAFFIC_INFO, 'NewPacketReceiveRate', 'PacketReceiveRate', INTEGER),
+        ('wan', TRAFFIC_INFO, 'NewPacketSendRate', 'PacketSendRate', INTEGER),
+        #('wan', TRAFFIC_INFO, 'NewTotalBytesReceived', 'TotalBytesReceived', INTEGER), #depreciated since 64bit is more usefull
+        #('wan', TRAFFIC_INFO, 'NewTotalBytesSent', 'TotalBytesSent', INTEGER), #depreciated since 64bit is more usefull
+        ('wan', TRAFFIC_INFO, 'NewX_AVM_DE_TotalBytesReceived64', 'TotalBytesReceived64', FLOAT),
+        ('wan', TRAFFIC_INFO, 'NewX_AVM_DE_TotalBytesSent64', 'TotalBytesSent64', FLOAT),
+        # DSL specific input
+        ('dsl', DSL_INFO, 'NewDownstreamCurrRate', 'DownstreamCurrRate', INTEGER),
+        ('dsl', DSL_INFO, 'NewUpstreamCurrRate', 'UpstreamCurrRate', INTEGER),
+        ('dsl', DSL_INFO, 'NewDownstreamMaxRate', 'DownstreamMaxRate', INTEGER),
+        ('dsl', DSL_INFO, 'NewUpstreamMaxRate', 'UpstreamMaxRate', INTEGER),
+        ('dsl', DSL_INFO, 'NewDownstreamNoiseMargin', 'DownstreamNoiseMargin', INTEGER),
+        ('dsl', DSL_INFO, 'NewUpstreamNoiseMargin', 'UpstreamNoiseMargin', INTEGER),
+        ('dsl', DSL_INFO, 'NewDownstreamPower', 'DownstreamPower', INTEGER),
+        ('dsl', DSL_INFO, 'NewUpstreamPower', 'UpstreamPower', INTEGER),
+        ('dsl', DSL_INFO, 'NewDownstreamAttenuation', 'DownstreamAttenuation', INTEGER),
+        ('dsl', DSL_INFO, 'NewUpstreamAttenuation', 'UpstreamAttenuation', INTEGER),
+        ('dsl', DSL_ERROR, 'NewHECErrors', 'HECErrors', INTEGER),
+        ('dsl', DSL_ERROR, 'NewATUCHECErrors', 'ATUCHECErrors', INTEGER),
+        ('dsl', DSL_ERROR, 'NewCRCErrors', 'CRCErrors', INTEGER),
+        ('dsl', DSL_ERROR, 'NewATUCCRCErrors', 'ATUCCRCErrors', INTEGER),
+        ('dsl', DSL_ERROR, 'NewFECErrors', 'FECErrors', INTEGER),
+        ('dsl', DSL_ERROR, 'NewATUCFECErrors', 'ATUCFECErrors', INTEGER),
+    )
+    counters = (
+        ('wan', 'TotalBytesReceived64', 64),
+        ('wan', 'TotalBytesSent64', 64),
+        ('dsl', 'HECErrors', 32),
+        ('dsl', 'ATUCHECErrors', 32),
+        ('dsl', 'CRCErrors', 32),
+        ('dsl', 'ATUCCRCErrors', 32),
+        ('dsl', 'FECErrors', 32),
+        ('dsl', 'ATUCFECErrors', 32),
+    )
+
+    def getrows(self, box):
+        # The DSL statistics only exist on a DSL uplink
+        if box.isDsl:
+            return self.rows
+        return [(tag, fields) for tag, fields in self.rows if tag != 'dsl']
+
+
+class HostsCollector(Collector):
+    name = 'hosts'
+    optional = True
+    metrics = (
+        # Network Information
+        ('network', CONNECTION_INFO, 'NewExternalIPAddress', 'ExternalIPAddress', STRING),
+        ('network', CONNECTION_INFO, 'NewDNSServers', 'DNSServers', STRING),
+        ('network', FRITZ_INFO, 'NewDNSServers', 'LocalDNSServer', STRING),
+        ('network', DHCP_INFO, 'NewHostNumberOfEntries', 'HostNumberOfEntries', INTEGER),
+        ('network', HOST_INFO, 'HostsKnown', 'HostsKnown', INTEGER),
+        ('network', HOST_INFO, 'HostsKnownLAN', 'HostsKnownLAN', INTEGER),
+        ('network', HOST_INFO, 'HostsKnownWLAN', 'HostsKnownWLAN', INTEGER),
+        ('network', HOST_INFO, 'HostsActive', 'HostsActive', INTEGER),
+        ('network', HOST_INFO, 'HostsActiveLAN', 'HostsActiveLAN', INTEGER),
+        ('network', HOST_INFO, 'HostsActiveWLAN', 'HostsActiveWLAN', INTEGER),
+        ('network', HOST_INFO, 'HostsCacheHits', 'HostsCacheHits', INTEGER),
+        ('network', HOST_INFO, 'HostsCacheMisses', 'HostsCacheMisses', INTEGER),
+    )
+
+    def getcalls(self, box, rows):
+        if not rows:
+            return []
+        return super().getcalls(box, rows) + [CHANGE_INFO] # only used as key for the host cache
+
+    def collect(self, box, answers):
+        answers[HOST_INFO] = self.getcachedhosts(box, answers[DHCP_INFO], answers[CHANGE_INFO])
+
+    # Speccialist Stats that have to be assembled (counted) ourselfes
+    def readhostlist(self, box, path):
+        for item in readitems(box, path):
+            yield item.get('Active') == '1', item.get('InterfaceType')
+
+    def readhostentries(self, box):
+        # Fallback for firmware without the host list download: one request per host
+        for n in itertools.count():
+            try:
+                host = box.callfritz('Hosts1', 'GetGenericHostEntry', NewIndex=n)
+            except IndexError:
+                break
+            yield host['NewActive'], host['NewInterfaceType']
+
+    def gethosts(self, box):
+        hostsKnown = 0
+        hostsActive = 0
+        lanHostsActive = 0
+        wlanHostsActive = 0
+        lanHosts = 0
+        wlanHosts = 0
+        start = time.monotonic()
+        try:
+            hostListPath = box.callfritz('Hosts1', 'X_AVM-DE_GetHostListPath')['NewX_AVM-DE_HostListPath']
+        except (FritzActionError, FritzServiceError):
+            hostListPath = '' # firmware without the host list download, other errors fail the poll
+        if hostListPath:
+            call = 'Hosts1.X_AVM-DE_GetHostListPath'
+            hostEntries = self.readhostlist(box, hostListPath)
+        else:
+            call = 'Hosts1.GetGenericHostEntry'
+            hostEntries = self.readhostentries(box)
+        for active, interfaceType in hostEntries:
+            hostsKnown = hostsKnown +1
+            if active:
+                hostsActive = hostsActive +1
+                if interfaceType == 'Ethernet': lanHostsActive = lanHostsActive +1
+                if interfaceType == '802.11': wlanHostsActive = wlanHostsActive +1
+            if interfaceType == 'Ethernet': lanHosts = lanHosts +1
+            if interfaceType == '802.11': wlanHosts = wlanHosts +1
+        box.callTimes[call] = time.monotonic() - start # all entries together
+        hosts = {'HostsKnown':hostsKnown, 'HostsActive':hostsActive, 'HostsKnownLAN':lanHosts, 'HostsActiveLAN':lanHostsActive, 'HostsKnownWLAN':wlanHosts, 'HostsActiveWLAN':wlanHostsActive,}
+        return hosts
+
+    # The host table only has to be read again after it changed. The box counts every change
+    # and the counter together with the number of entries is used as the key of the cache.
+    def getcachedhosts(self, box, dhcpInfo, changeInfo):
+        hostCache = box.hostCache
+        changeCounter = next(iter(changeInfo.values()), None) # the action has only one output argument
+        key = [dhcpInfo.get('NewHostNumberOfEntries'), changeCounter]
+        if changeCounter is not None and key == hostCache['key']:
+            hostCache['hits'] = hostCache['hits'] +1
+        else:
+            hostCache['hosts'] = self.gethosts(box)
+            hostCache['key'] = key if changeCounter is not None else None # without a counter every poll is a miss
+            hostCache['misses'] = hostCache['misses'] +1
+        hosts = dict(hostCache['hosts'])
+        hosts['HostsCacheHits'] = hostCache['hits']
+        hosts['HostsCacheMisses'] = hostCache['misses']
+        return hosts
+
+
+class LanCollector(Collector):
+    name = 'lan'
+    metrics = (
+        # Local network Statistics
+        ('lan', LAN_STAT, 'NewPacketsSent', 'PacketsSent', INTEGER),
+        ('lan', LAN_STAT, 'NewPacketsReceived', 'PacketsReceived', INTEGER),
+    )
+    counters = (
+        ('lan', 'PacketsSent', 32),
+        ('lan', 'PacketsReceived', 32),
+    )
+
+
+class WlanCollector(Collector):
+    name = 'wlan'
+    optional = True
+    metrics = (
+        ('wlan_2.4GHz', WLAN_INFO_24, 'NewSSID', 'SSID', STRING),
+        ('wlan_2.4GHz', WLAN_INFO_24, 'NewChannel', 'Channel', INTEGER),
+        ('wlan_2.4GHz', WLAN_ASSOC_24, 'NewTotalAssociations', 'ClientsNumber', INTEGER),
+        ('wlan_2.4GHz', WLAN_STAT_24, 'NewTotalPacketsSent', 'PacketsSent', INTEGER),
+        ('wlan_2.4GHz', WLAN_STAT_24, 'NewTotalPacketsReceived', 'PacketsReceived', INTEGER),
+        ('wlan_5GHz', WLAN_INFO_50, 'NewSSID', 'SSID', STRING),
+        ('wlan_5GHz', WLAN_INFO_50, 'NewChannel', 'Channel', INTEGER),
+        ('wlan_5GHz', WLAN_ASSOC_50, 'NewTotalAssociations', 'ClientsNumber', INTEGER),
+        ('wlan_5GHz', WLAN_STAT_50, 'NewTotalPacketsSent', 'PacketsSent', INTEGER),
+        ('wlan_5GHz', WLAN_STAT_50, 'NewTotalPacketsReceived', 'PacketsReceived', INTEGER),
+        ('wlan_Guest', WLAN_INFO_GUEST, 'NewSSID', 'SSID', STRING),
+        ('wlan_Guest', WLAN_INFO_GUEST, 'NewChannel', 'Channel', INTEGER),
+        ('wlan_Guest', WLAN_ASSOC_GUEST, 'NewTotalAssociations', 'ClientsNumber', INTEGER),
+        ('wlan_Guest', WLAN_STAT_GUEST, 'NewTotalPacketsSent', 'PacketsSent', INTEGER),
+        ('wlan_Guest', WLAN_STAT_GUEST, 'NewTotalPacketsReceived', 'PacketsReceived', INTEGER),
+    )
+    counters = (
+        ('wlan_2.4GHz', 'PacketsSent', 32),
+        ('wlan_2.4GHz', 'PacketsReceived', 32),
+        ('wlan_5GHz', 'PacketsSent', 32),
+        ('wlan_5GHz', 'PacketsReceived', 32),
+        ('wlan_Guest', 'PacketsSent', 32),
+        ('wlan_Guest', 'PacketsReceived', 32),
+    )
+
+
+# One line per WLAN client. Clients come and go, so the number of series is limited:
+# at most --clients clients are output (those with the fastest link first), a client keeps its
+# place while it is associated and loses it --clientexpiry seconds after it was seen the last time.
+class ClientsCollector(Collector):
+    name = 'clients'
+    group = 'wlanclient'
+    optional = True
+    bands = (
+        ('2.4GHz', WLAN_LIST_24, WLAN_ASSOC_24),
+        ('5GHz', WLAN_LIST_50, WLAN_ASSOC_50),
+        ('Guest', WLAN_LIST_GUEST, WLAN_ASSOC_GUEST),
+    )
+    # Variables of the device list, the answers of GetGenericAssociatedDeviceInfo have the prefix New
+    fields = (
+        ('AssociatedDeviceIPAddress', 'IPAddress', STRING),
+        ('X_AVM-DE_SignalStrength', 'SignalStrength', INTEGER), # in percent
+        ('X_AVM-DE_Speed', 'Speed', INTEGER), # Mbit/s sent to the client
+        ('X_AVM-DE_SpeedRX', 'SpeedRX', INTEGER), # Mbit/s received from the client
+    )
+    limit = 20
+    allowed = ()
+    expiry = 3600
+
+    def configure(self, args):
+        self.limit = args.clients
+        self.allowed = {mac.strip().upper() for mac in args.clientallow.split(',') if mac.strip()}
+        self.expiry = args.clientexpiry
+
+    def getcalls(self, box, rows):
+        return [call for band, listCall, countCall in self.bands for call in (listCall, countCall)]
+
+    def readcliententries(self, box, service, count):
+        # Fallback for firmware without the device list download: one request per client, as many at once as there are workers
+        with ThreadPoolExecutor(max_workers=box.workers) as pool:
+            futures = [pool.submit(box.readfritz, service, 'GetGenericAssociatedDeviceInfo', NewAssociatedDeviceIndex=n) for n in range(count)]
+            return [{variable[3:]: value for variable, value in future.result().items()} for future in futures]
+
+    def getclients(self, box, answers):
+        clients = dict()
+        for band, listCall, countCall in self.bands:
+            path = answers[listCall].get('NewX_AVM-DE_WLANDeviceListPath')
+            count = answers[countCall].get('NewTotalAssociations')
+            if path:
+                try:
+                    entries = list(readitems(box, path))
+                except Exception as e:
+                    # an optional collector, one band that can not be read must not fail the poll of the box
+                    if isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+                        box.recordtimeout()
+                    print(box.name + ': cannot read the WLAN clients of ' + band + ': ' + str(e), file=sys.stderr)
+                    continue
+            elif count:
+                entries = self.readcliententries(box, listCall[0], int(count))
+            else:
+                continue # no such band or no clients
+            for entry in entries:
+                mac = (entry.get('AssociatedDeviceMACAddress') or '').upper()
+                if mac and (not self.allowed or mac in self.allowed):
+                    clients[mac] = (band, entry)
+        return clients
+
+    def selectclients(self, box, clients):
+        # box.clients holds the clients that are output and when they were seen the last time
+        now = box.pollTime
+        for mac, lastSeen in list(box.clients.items()):
+            if mac in clients:
+                box.clients[mac] = now
+            elif now - lastSeen > self.expiry:
+                del box.clients[mac]
+        newClients = sorted((mac for mac in clients if mac not in box.clients),
+                            key=lambda mac: -int(clients[mac][1].get('X_AVM-DE_Speed') or 0))
+        if self.limit:
+            newClients = newClients[:max(0, self.limit - len(box.clients))]
+        for mac in newClients:
+            box.clients[mac] = now
+        return [mac for mac in clients if mac in box.clients]
+
+    def output(self, box, answers):
+        start = time.monotonic()
+        clients = self.getclients(box, answers)
+        box.callTimes['WLANConfiguration.AssociatedDevices'] = time.monotonic() - start # all bands together
+        for mac in self.selectclients(box, clients):
+            band, entry = clients[mac]
+            fields = [lineprotocol.field(name, entry[variable], fieldType) for variable, name, fieldType in self.fields if entry.get(variable) is not None]
+            box.influxrow(self.measurement, (('host', box.hostName), ('source', 'wlanclient'), ('band', band), ('mac', mac)), fields)
+
+
+# One line per smarthome device, tagged with the name of the device
+class SmartHomeCollector(Collector):
+    name = 'smarthome'
+    group = 'smarthome'
+    optional = True
+    measurement = SMARTHOME_ID
+    fields = (
+        ('NewMultimeterPower', 'Power', INTEGER), # Power currently consumed in W *100
+        ('NewMultimeterEnergy', 'Energy', INTEGER), # Energy consumed in Wh
+        ('NewTemperatureCelsius', 'Temperature', INTEGER), # Temperature in celcius * 10
+    )
+
+    # The AHA interface tells power in mW, TR-064 in W *100
+    ahaFields = (
+        ('powermeter/power', 'NewMultimeterPower', 10),
+        ('powermeter/energy', 'NewMultimeterEnergy', 1),
+        ('temperature/celsius', 'NewTemperatureCelsius', 1),
+    )
+
+    def readdevicelist(self, box):
+        # All devices with one request, converted to the answers of GetGenericDeviceInfos
+        devices = []
+        for item in aha.getdevicelist(box):
+            device = {'NewDeviceName': item.findtext('name', '')}
+            for path, variable, scale in self.ahaFields:
+                try:
+                    device[variable] = int(item.findtext(path)) // scale
+                except (TypeError, ValueError):
+                    pass # the device does not measure this or is not connected
+            devices.append(device)
+        return devices
+
+    def readdeviceentries(self, box):
+        # Fallback without the AHA interface: one request per device, as many at once as there are workers
+        # The number of devices is unknown, so the indices are requested in batches until one is out of range
+        devices = []
+        with ThreadPoolExecutor(max_workers=box.workers) as pool:
+            for start in itertools.count(0, box.workers):
+                batch = [pool.submit(box.callfritz, 'X_AVM-DE_Homeauto1', 'GetGenericDeviceInfos', NewIndex=n)
+                         for n in range(start, start + box.workers)]
+                for future in batch:
+                    try:
+                        devices.append(future.result())
+                    except IndexError:
+                        return devices
+
+    def getdevices(self, box):
+        start = time.monotonic()
+        call = 'AHA.getdevicelistinfos'
+        devices = aha.read(box, self.readdevicelist, 'reading every device over TR-064')
+        if devices is None:
+            call = 'X_AVM-DE_Homeauto1.GetGenericDeviceInfos'
+            devices = self.readdeviceentries(box)
+        box.callTimes[call] = time.monotonic() - start # all devices together
+        return devices
+
+    def output(self, box, answers):
+        # Generate one influxDB line per smarthome device
+        for device in self.getdevices(box):
+            fields = [lineprotocol.field(name, device[variable], fieldType) for variable, name, fieldType in self.fields if variable in device]
+            box.influxrow(self.measurement, (('source', device.get('NewDeviceName', '')),), fields)
+
+
+# The history the box keeps of every smarthome device (AHA getbasicdevicestats), as points with their own time
+# Energy curves without polling every few seconds, and no gaps while the script was not running.
+# Of every series only the finest grid is output, and of that only the values newer than the last ones output.
+class SmartHomeHistoryCollector(Collector):
+    name = 'smarthomehistory'
+    group = 'smarthomehistory'
+    measurement = SMARTHOME_ID
+    optional = True
+    series = (
+        ('power', 'Power', INTEGER), # Average power in W *100, like the Power of the smarthome collector
+        ('energy', 'EnergyDelta', INTEGER), # Energy consumed in the interval in Wh
+        ('voltage', 'Voltage', INTEGER), # Voltage in mV
+        ('temperature', 'Temperature', INTEGER), # Temperature in celcius * 10
+        ('humidity', 'Humidity', INTEGER), # Relative humidity in %
+    )
+
+    def readhistory(self, box):
+        # Name and history of every device, the devices are requested concurrently
+        devices = [(item.get('identifier', ''), item.findtext('name', '')) for item in aha.getdevicelist(box)]
+        with ThreadPoolExecutor(max_workers=box.workers) as pool:
+            futures = [(ain, name, pool.submit(self.readdevicestats, box, ain, name)) for ain, name in devices]
+            return [(ain, name, future.result()) for ain, name, future in futures]
+
+    def readdevicestats(self, box, ain, name):
+        # A device whose history can not be read is left out of this poll, the other devices are output
+        try:
+            return aha.getdevicestats(box, ain)
+        except (aha.AhaError, requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            raise # the interface or the box, not the device, see aha.read()
+        except Exception as e:
+            print(box.name + ': cannot read the smarthome history of ' + name + ': ' + str(e), file=sys.stderr)
+            return []
+
+    def output(self, box, answers):
+        start = time.monotonic()
+        devices = aha.read(box, self.readhistory, 'no smarthome history') # there is no history over TR-064
+        if devices is None:
+            return
+        box.callTimes['AHA.getbasicdevicestats'] = time.monotonic() - start # all devices together
+        for ain, name, history in devices:
+            self.outputhistory(box, ain, name, history)
+
+    def outputhistory(self, box, ain, name, history):
+        # One line per point in time with the values of all series at that time
+        # The points are at the start of their interval. The newest interval is still running, it is output
+        # with every poll at the same time so InfluxDB overwrites it, and for the last time once it is complete.
+        finest = dict()
+        for series, grid, newest, values in history:
+            if series not in finest or grid < finest[series][0]:
+                finest[series] = (grid, newest, values)
+        last = box.history.setdefault(ain, dict()) # start of the newest complete interval output of every series
+        points = dict()
+        for series, fieldName, fieldType in self.series:
+            if series not in finest:
+                continue # the device does not measure this
+            grid, newest, values = finest[series]
+            if newest is None:
+                newest = box.pollTime # older firmware, the values end about now
+            running = int(newest) // grid * grid
+            for n, value in enumerate(values):
+                timestamp = running - n * grid
+                if n and timestamp <= last.get(series, 0):
+                    break
+                if value is not None:
+                    points.setdefault(timestamp, []).append(lineprotocol.field(fieldName, value, fieldType))
+            last[series] = max(running - grid, last.get(series, 0))
+        for timestamp, fields in sorted(points.items()):
+            box.influxrow(self.measurement, (('source', name),), fields, timestamp)
+
+
+# Measures the collector itself: one line with the duration of every request and the failed requests
+# of this poll, and in total the requests, failures, the duration of the poll and of the connection setup
+class StatsCollector(Collector):
+    name = 'stats'
+
+    def output(self, box, answers):
+        fields = [lineprotocol.field('Calls', box.calls, INTEGER),
+                  lineprotocol.field('Errors', sum(box.callErrors.values()), INTEGER),
+                  lineprotocol.field('PollTime', round(time.monotonic() - box.runStart, 4), FLOAT)]
+        if box.connectTime is not None:
+            fields.append(lineprotocol.field('ConnectTime', round(box.connectTime, 4), FLOAT))
+        for call, duration in sorted(box.callTimes.items()):
+            fields.append(lineprotocol.field(call, round(duration, 4), FLOAT))
+        for call, errors in sorted(box.callErrors.items()):
+            fields.append(lineprotocol.field(call + '.Errors', errors, INTEGER))
+        box.influxrow(self.measurement, (('host', box.hostName), ('source', 'collector')), fields)
+
+
+# All collectors by name, in output order
+COLLECTORS = {collector.name: collector for collector in (SystemCollector(), WanCollector(), HostsCollector(), LanCollector(), WlanCollector(), ClientsCollector(), SmartHomeCollector(), SmartHomeHistoryCollector(), StatsCollector())}
+FRITZBOX_COLLECTORS = ('system', 'wan', 'hosts', 'lan', 'wlan', 'stats')
@@ -0,0 +1,111 @@
+# Encoder for the InfluxDB line protocol as read by Telegraf.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Escaping rules: https://docs.influxdata.com/influxdb/v1.8/write_protocols/line_protocol_reference/
+# measurement <,tag=value...> field=value<,field=value...>
+
+import re
+import math
+
+
+# Types of the influxDB fields
+INTEGER = 'integer'
+FLOAT = 'float'
+STRING = 'string'
+BOOLEAN = 'boolean'
+
+NAME_ESCAPES = str.maketrans({',': '\\,', ' ': '\\ ', '\n': '\\n'})
+KEY_ESCAPES = str.maketrans({',': '\\,', '=': '\\=', ' ': '\\ ', '\n': '\\n'})
+STRING_ESCAPES = str.maketrans({'"': '\\"', '\\': '\\\\', '\n': '\\n'})
+
+
+# Escaping of the names, measurement names use other rules than tag and field names
+def escapename(measurement):
+    return str(measurement).translate(NAME_ESCAPES)
+
+def escapekey(key):
+    # Used for tag keys, tag values and field keys
+    return str(key).translate(KEY_ESCAPES)
+
+
+# Formats of the field values, values that can not be written as the given type return None
+# TR-064 answers are mostly int or str already, these are handled first without conversions
+def formatinteger(value):
+    if type(value) is int:
+        return str(value) + 'i'
+    try:
+        return str(int(value)) + 'i'
+    except (TypeError, ValueError):
+        return None
+
+def formatfloat(value):
+    if type(value) is int:
+        return str(value)
+    text = str(value).strip()
+    if text.isdigit() and text.isascii():
+        return text # integral values are valid floats, and keep all digits of 64bit counters
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    if not math.isfinite(number):
+        return None
+    return repr(number)
+
+def formatstring(value):
+    text = str(value)
+    if '"' in text or '\\' in text or '\n' in text:
+        text = text.translate(STRING_ESCAPES)
+    return '"' + text + '"'
+
+def formatboolean(value):
+    if isinstance(value, str):
+        value = value.strip().lower() in ('1', 'true', 't', 'yes')
+    return 'true' if value else 'false'
+
+FORMATS = {INTEGER: formatinteger, FLOAT: formatfloat, STRING: formatstring, BOOLEAN: formatboolean}
+
+
+def field(name, value, fieldType):
+    # One "name=value" pair, None if the value does not fit the type
+    value = FORMATS[fieldType](value)
+    if value is None:
+        return None
+    return escapekey(name) + '=' + value
+
+def tagset(measurement, tags):
+    # Measurement and tags as start of a line, tags without value are left out
+    return escapename(measurement) + ''.join([',' + escapekey(key) + '=' + escapekey(value) for key, value in tags if value not in (None, '')])
+
+def line(measurement, tags, fields, timestamp=None):
+    # tags are (key, value) pairs, fields are already formatted "name=value" strings
+    # timestamp in seconds, without it the time of writing is used by Telegraf or InfluxDB
+    fields = [field for field in fields if field]
+    if not fields:
+        return '' # a line without fields is not valid
+    if timestamp is not None:
+        return tagset(measurement, tags) + ' ' + ','.join(fields) + ' %d' % (int(timestamp) * 1000000000)
+    return tagset(measurement, tags) + ' ' + ','.join(fields)
+
+
+# Decoding of a formatted field for outputs other than the line protocol
+FIELD_PATTERN = re.compile(r'((?:[^=\\]|\\.)*)=(.*)$', re.DOTALL)
+UNESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+def unescape(text):
+    # Reverses the escapes above, \n is the only one that is not the escaped character itself
+    return UNESCAPE_PATTERN.sub(lambda match: '\n' if match.group(1) == 'n' else match.group(1), text)
+
+def parsefield(field):
+    # Returns name and value of a "name=value" pair as formatted by field()
+    name, value = FIELD_PATTERN.match(field).groups()
+    name = unescape(name)
+    if value.startswith('"'):
+        return name, unescape(value[1:-1])
+    if value in ('true', 'false'):
+        return name, value == 'true'
+    if value.endswith('i'):
+        return name, int(value[:-1])
+    return name, float(value)
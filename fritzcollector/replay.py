@@ -0,0 +1,221 @@
+# Recorded answers of a FritzBox, replayed without a box for benchmarks and offline development.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# A fixture is a json file with everything a poll reads from a box:
+#   "actions":   answer of every TR-064 action as "Service.Action", a list of answers for the actions with an index
+#   "documents": the xml downloads (host list, AHA interface) by path
+#   "system_version", "system_info": the device information of fritzconnection
+# ReplayConnection stands in for FritzConnection and answers from a fixture, RecordingConnection
+# wraps a real connection and writes down everything that is read through it.
+
+from fritzconnection.core.exceptions import FritzActionError
+import io
+import json
+import time
+import threading
+from urllib.parse import urlsplit
+
+
+# Parameters of the AHA interface that are left out of the document key, they change with every login
+SESSION_PARAMETERS = ('sid', 'username', 'response', 'version')
+
+
+def documentkey(url, params=None):
+    # Path of the url, with the parameters that select the document (e.g. switchcmd of the AHA interface)
+    key = urlsplit(url).path
+    selectors = sorted((name, str(value)) for name, value in (params or dict()).items() if name not in SESSION_PARAMETERS)
+    if selectors:
+        key = key + '?' + '&'.join(name + '=' + value for name, value in selectors)
+    return key
+
+def loadfixture(filename):
+    with open(filename) as fixtureFile:
+        return json.load(fixtureFile)
+
+def savefixture(filename, fixture):
+    with open(filename, 'w') as fixtureFile:
+        json.dump(fixture, fixtureFile, indent=1, sort_keys=True)
+
+
+class ReplayResponse:
+    # The parts of a requests response the collectors use
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.raw = io.BytesIO(content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError('HTTP status %s' % self.status_code)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class ReplaySession:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get(self, url, params=None, **options):
+        self.connection.count()
+        document = self.connection.fixture['documents'].get(documentkey(url, params))
+        if document is None:
+            return ReplayResponse(b'', 404)
+        return ReplayResponse(document.encode())
+
+
+class ReplayDeviceManager:
+    def __init__(self, fixture):
+        self.system_version = fixture.get('system_version')
+        self.system_info = fixture.get('system_info')
+
+
+class ReplayConnection:
+    # Answers like FritzConnection from a fixture, every request waits the given latency in seconds
+    def __init__(self, fixture, latency=0.0, address='http://169.254.1.1', port=49000):
+        self.fixture = fixture
+        self.latency = latency
+        self.address = address
+        self.port = port
+        self.timeout = 2.0
+        self.session = ReplaySession(self)
+        self.device_manager = ReplayDeviceManager(fixture)
+        self.calls = 0 # requests answered so far
+        self.lock = threading.Lock()
+
+    def count(self):
+        with self.lock:
+            self.calls = self.calls +1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def call_action(self, service, action, **arguments):
+        self.count()
+        answer = self.fixture['actions'].get(service + '.' + action)
+        if answer is None:
+            raise FritzActionError('no recorded answer for ' + service + '.' + action) # like the box for an unknown action
+        if isinstance(answer, list):
+            index = int(next(iter(arguments.values())))
+            if index >= len(answer):
+                raise IndexError(index) # like the box at the end of a table
+            answer = answer[index]
+        return dict(answer)
+
+
+class RecordingSession:
+    def __init__(self, session, fixture):
+        self.session = session
+        self.fixture = fixture
+
+    def get(self, url, params=None, **options):
+        with self.session.get(url, params=params, **options) as response:
+            content = response.content
+            status = response.status_code
+        if status == 200:
+            self.fixture['documents'][documentkey(url, params)] = content.decode()
+        return ReplayResponse(content, status)
+
+
+class RecordingConnection:
+    # Passes every request to a real FritzConnection and keeps the answers as fixture
+    def __init__(self, fc):
+        self.fc = fc
+        self.address = fc.address
+        self.port = fc.port
+        self.timeout = fc.timeout
+        self.device_manager = fc.device_manager
+        self.fixture = {'actions': dict(), 'documents': dict(),
+                        'system_version': fc.device_manager.system_version, 'system_info': fc.device_manager.system_info}
+        self.session = RecordingSession(fc.session, self.fixture)
+        self.lock = threading.Lock()
+
+    def call_action(self, service, action, **arguments):
+        answer = self.fc.call_action(service, action, **arguments)
+        key = service + '.' + action
+        with self.lock:
+            if arguments:
+                answers = self.fixture['actions'].setdefault(key, [])
+                index = int(next(iter(arguments.values())))
+                answers.extend([dict()] * (index +1 - len(answers)))
+                answers[index] = dict(answer)
+            else:
+                self.fixture['actions'][key] = dict(answer)
+        return answer
+
+
+# A made up box with the given number of hosts, WLAN clients and smarthome devices
+def examplefixture(hosts=200, devices=40, clients=30):
+    actions = {
+        'DeviceInfo1.GetInfo': {'NewModelName': 'FRITZ!Box 7590', 'NewSerialNumber': '0123456789AB', 'NewSoftwareVersion': '154.07.29', 'NewUpTime': 864000},
+        'LANHostConfigManagement1.GetInfo': {'NewDomainName': 'fritz.box', 'NewDNSServers': '192.168.178.1'},
+        'Layer3Forwarding1.GetDefaultConnectionService': {'NewDefaultConnectionService': '1.WANPPPConnection.1'},
+        'WANCommonIFC1.GetCommonLinkProperties': {'NewWANAccessType': 'DSL', 'NewLayer1DownstreamMaxBitRate': 116790000, 'NewLayer1UpstreamMaxBitRate': 46720000},
+        'WANCommonIFC1.GetAddonInfos': {'NewByteReceiveRate': 125000, 'NewByteSendRate': 12500, 'NewPacketReceiveRate': 100, 'NewPacketSendRate': 50,
+                                        'NewX_AVM_DE_TotalBytesReceived64': '1234567890123', 'NewX_AVM_DE_TotalBytesSent64': '123456789012'},
+        'WANPPPConnection1.GetInfo': {'NewUptime': 86400, 'NewConnectionStatus': 'Connected', 'NewLastConnectionError': 'ERROR_NONE',
+                                      'NewExternalIPAddress': '203.0.113.1', 'NewDNSServers': '203.0.113.53, 203.0.113.54'},
+        'WANDSLInterfaceConfig1.GetInfo': {'NewDownstreamCurrRate': 109999, 'NewUpstreamCurrRate': 41999, 'NewDownstreamMaxRate': 130000, 'NewUpstreamMaxRate': 45000,
+                                           'NewDownstreamNoiseMargin': 60, 'NewUpstreamNoiseMargin': 80, 'NewDownstreamPower': 513, 'NewUpstreamPower': 70,
+                                           'NewDownstreamAttenuation': 120, 'NewUpstreamAttenuation': 110},
+        'WANDSLInterfaceConfig1.GetStatisticsTotal': {'NewFECErrors': 0, 'NewATUCFECErrors': 0, 'NewCRCErrors': 12, 'NewATUCCRCErrors': 3, 'NewHECErrors': 0, 'NewATUCHECErrors': 0},
+        'Hosts1.GetHostNumberOfEntries': {'NewHostNumberOfEntries': hosts},
+        'Hosts1.X_AVM-DE_GetChangeCounter': {'NewX_AVM-DE_GetChangeCounter': 42},
+        'Hosts1.X_AVM-DE_GetHostListPath': {'NewX_AVM-DE_HostListPath': '/devicehostlist.lua?sid=0123456789abcdef'},
+        'Hosts1.GetGenericHostEntry': [],
+        'LANEthernetInterfaceConfig1.GetStatistics': {'NewPacketsSent': 123456, 'NewPacketsReceived': 654321},
+        'X_AVM-DE_Homeauto1.GetGenericDeviceInfos': [],
+    }
+    documents = {
+        '/login_sid.lua': '<SessionInfo><SID>0123456789abcdef</SID><Challenge>1234567z</Challenge><BlockTime>0</BlockTime></SessionInfo>',
+    }
+    hostItems = []
+    for n in range(hosts):
+        interfaceType = ('Ethernet', '802.11', '')[n % 3]
+        active = n % 2
+        actions['Hosts1.GetGenericHostEntry'].append({'NewIPAddress': '192.168.178.%d' % (n % 250 +2), 'NewMACAddress': '02:00:00:00:%02X:%02X' % (n // 256, n % 256),
+                                                      'NewActive': bool(active), 'NewHostName': 'host%d' % n, 'NewInterfaceType': interfaceType})
+        hostItems.append('<Item><Index>%d</Index><IPAddress>192.168.178.%d</IPAddress><MACAddress>02:00:00:00:%02X:%02X</MACAddress><Active>%d</Active>'
+                         '<HostName>host%d</HostName><InterfaceType>%s</InterfaceType></Item>' % (n +1, n % 250 +2, n // 256, n % 256, active, n, interfaceType))
+    documents['/devicehostlist.lua'] = '<List><HostNumberOfEntries>%d</HostNumberOfEntries>%s</List>' % (hosts, ''.join(hostItems))
+    for band, ssid in ((1, 'MyWifi'), (2, 'MyWifi5'), (3, 'Guest')):
+        service = 'WLANConfiguration%d' % band
+        bandClients = [n for n in range(clients) if n % 3 == band -1]
+        actions[service + '.GetInfo'] = {'NewSSID': ssid, 'NewChannel': (1, 36, 11)[band -1]}
+        actions[service + '.GetStatistics'] = {'NewTotalPacketsSent': 100000 * band, 'NewTotalPacketsReceived': 200000 * band}
+        actions[service + '.GetTotalAssociations'] = {'NewTotalAssociations': len(bandClients)}
+        actions[service + '.X_AVM-DE_GetWLANDeviceListPath'] = {'NewX_AVM-DE_WLANDeviceListPath': '/wlandevicelist%d.lua?sid=0123456789abcdef' % band}
+        actions[service + '.GetGenericAssociatedDeviceInfo'] = []
+        clientItems = []
+        for n in bandClients:
+            client = {'AssociatedDeviceMACAddress': '02:00:00:01:00:%02X' % n, 'AssociatedDeviceIPAddress': '192.168.178.%d' % (n +100),
+                      'X_AVM-DE_SignalStrength': 40 + n, 'X_AVM-DE_Speed': 100 + 10 * n, 'X_AVM-DE_SpeedRX': 90 + 10 * n}
+            actions[service + '.GetGenericAssociatedDeviceInfo'].append({'New' + name: value for name, value in client.items()})
+            clientItems.append('<Item>' + ''.join('<%s>%s</%s>' % (name, value, name) for name, value in client.items()) + '</Item>')
+        documents['/wlandevicelist%d.lua' % band] = '<List>' + ''.join(clientItems) + '</List>'
+    deviceItems = []
+    for n in range(devices):
+        actions['X_AVM-DE_Homeauto1.GetGenericDeviceInfos'].append({'NewAIN': '11657 %07d' % n, 'NewDeviceName': 'Device %d' % n, 'NewPresent': 'CONNECTED',
+                                                                     'NewMultimeterPower': 100 * n, 'NewMultimeterEnergy': 1000 + n, 'NewTemperatureCelsius': 200 + n})
+        deviceItems.append('<device identifier="11657 %07d" id="%d"><present>1</present><name>Device %d</name>'
+                           '<powermeter><power>%d</power><energy>%d</energy></powermeter><temperature><celsius>%d</celsius></temperature></device>'
+                           % (n, n +16, n, 1000 * n, 1000 + n, 200 + n))
+        documents['/webservices/homeautoswitch.lua?ain=11657 %07d&switchcmd=getbasicdevicestats' % n] = (
+            '<devicestats><temperature><stats count="96" grid="900" datatime="1700000000">%s</stats></temperature>'
+            '<power><stats count="360" grid="10" datatime="1700000000">%s</stats></power>'
+            '<energy><stats count="31" grid="86400" datatime="1700000000">%s</stats></energy></devicestats>'
+            % (','.join(['%d' % (200 + n)] * 96), ','.join(['%d' % (100 * n)] * 360), ','.join(['%d' % (24 * n)] * 31)))
+    documents['/webservices/homeautoswitch.lua?switchcmd=getdevicelistinfos'] = '<devicelist version="1">' + ''.join(deviceItems) + '</devicelist>'
+    return {'actions': actions, 'documents': documents, 'system_version': '7.29', 'system_info': ['154', '7', '29', '0', '85386', '154.07.29']}
+
+def withoutdocuments(fixture):
+    # The same box with older firmware, where every host, client and device is a request of its own
+    actions = {key: answer for key, answer in fixture['actions'].items() if not key.endswith('ListPath')}
+    return dict(fixture, actions=actions, documents=dict())
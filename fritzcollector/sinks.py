@@ -0,0 +1,147 @@
+# Outputs of the collected points: stdout for Telegraf, InfluxDB and Prometheus.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Every sink gets the points of all boxes once per poll as (measurement, tags, fields, timestamp),
+# the fields are formatted "name=value" strings, see lineprotocol.py.
+
+from fritzcollector import lineprotocol
+import re
+import sys
+import gzip
+import time
+import itertools
+import threading
+import collections
+import requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+BATCH_SIZE = 5000 # Lines per write request to InfluxDB
+BUFFER_SIZE = 100000 # Lines kept for the next try while InfluxDB can not be reached, the oldest are dropped first
+PROMETHEUS_PORT = 9118
+
+
+class Sink:
+    def write(self, points):
+        pass
+
+    def close(self):
+        pass
+
+
+# All lines of a poll in one write, for the Telegraf exec and execd plugins
+class StdoutSink(Sink):
+    def write(self, points):
+        lines = [lineprotocol.line(*point) for point in points]
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
+
+# Writes directly to InfluxDB: the v2 API with a token, the v1 API with a database otherwise
+# Lines that can not be written are kept and sent again with the next poll
+class InfluxSink(Sink):
+    def __init__(self, url, database='', token='', org='', bucket='', user='', password='', batchSize=BATCH_SIZE, bufferSize=BUFFER_SIZE, timeout=10):
+        self.session = requests.Session()
+        if token:
+            self.url = url.rstrip('/') + '/api/v2/write'
+            self.params = {'org': org, 'bucket': bucket, 'precision': 'ns'}
+            self.session.headers['Authorization'] = 'Token ' + token
+        else:
+            self.url = url.rstrip('/') + '/write'
+            self.params = {'db': database, 'precision': 'ns'}
+            if user:
+                self.session.auth = (user, password)
+        self.session.headers['Content-Encoding'] = 'gzip'
+        self.session.headers['Content-Type'] = 'text/plain; charset=utf-8'
+        self.batchSize = batchSize
+        self.buffer = collections.deque(maxlen=bufferSize)
+        self.timeout = timeout
+
+    def write(self, points):
+        # The lines get the time of the poll, so lines that are sent again keep their time
+        now = time.time()
+        lines = [lineprotocol.line(measurement, tags, fields, now if timestamp is None else timestamp) for measurement, tags, fields, timestamp in points]
+        dropped = len(self.buffer) + len(lines) - self.buffer.maxlen
+        if dropped > 0:
+            print('InfluxDB: buffer full, dropping the %d oldest lines' % dropped, file=sys.stderr)
+        self.buffer.extend(lines)
+        while self.buffer:
+            batch = list(itertools.islice(self.buffer, self.batchSize))
+            if not self.send(batch):
+                return # try again with the next poll
+            for line in batch:
+                self.buffer.popleft()
+
+    def send(self, batch):
+        # True if the batch is done, False to keep it for the next try
+        body = gzip.compress(('\n'.join(batch) + '\n').encode())
+        try:
+            response = self.session.post(self.url, params=self.params, data=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            print('InfluxDB: cannot write: ' + str(e), file=sys.stderr)
+            return False
+        if response.status_code == 429 or response.status_code >= 500:
+            print('InfluxDB: cannot write now: HTTP %s' % response.status_code, file=sys.stderr)
+            return False
+        if response.status_code >= 400:
+            # the lines are refused and would be refused again
+            print('InfluxDB: %d lines refused: HTTP %s %s' % (len(batch), response.status_code, response.text.strip()), file=sys.stderr)
+        return True
+
+    def close(self):
+        self.write([]) # last try for the buffered lines
+
+
+# Serves the points of the last poll at http://ADDRESS:PORT/metrics
+# Every numeric field is a gauge named measurement_field, the tags are its labels
+class PrometheusSink(Sink):
+    def __init__(self, port=PROMETHEUS_PORT, address=''):
+        self.snapshot = b''
+        self.server = ThreadingHTTPServer((address, port), PrometheusHandler)
+        self.server.sink = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def write(self, points):
+        metrics = dict()
+        for measurement, tags, fields, timestamp in points:
+            if timestamp is not None:
+                continue # only the current values, not the history
+            labels = ','.join(metricname(key) + '="' + labelvalue(value) + '"' for key, value in tags if value not in (None, ''))
+            for field in fields:
+                name, value = lineprotocol.parsefield(field)
+                if isinstance(value, str):
+                    continue # Prometheus only has numbers
+                metrics.setdefault(metricname(measurement + '_' + name), []).append('{%s} %s' % (labels, repr(float(value))))
+        text = []
+        for name, samples in metrics.items():
+            text.append('# TYPE %s gauge' % name)
+            text.extend(name + sample for sample in samples)
+        self.snapshot = ('\n'.join(text) + '\n').encode()
+
+    def close(self):
+        self.server.shutdown()
+
+class PrometheusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        snapshot = self.server.sink.snapshot
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(snapshot)))
+        self.end_headers()
+        self.wfile.write(snapshot)
+
+    def log_message(self, format, *args):
+        pass # no log line for every scrape
+
+def metricname(name):
+    name = re.sub(r'[^a-zA-Z0-9_]', '_', name)
+    return '_' + name if name[:1].isdigit() else name
+
+def labelvalue(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,119 @@
+# Tests of the line protocol encoder with SSIDs and device names that need escaping.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Run with:
+# python3 -m pytest tests
+
+import unittest
+
+from fritzcollector import lineprotocol
+from fritzcollector.lineprotocol import INTEGER, FLOAT, STRING, BOOLEAN
+
+
+# Names as they come from the box, each with the characters the line protocol has to escape
+TRICKY_NAMES = (
+    'Living Room',
+    'Kitchen,Plug',
+    'a=b',
+    'Say "Hi"',
+    'back\\slash',
+    'two\nlines',
+    'NewYork',
+    'Wohnzimmer Ä,ö=ü "ß"',
+)
+
+
+class EscapeTest(unittest.TestCase):
+    def test_escapekey(self):
+        self.assertEqual(lineprotocol.escapekey('Living Room'), 'Living\\ Room')
+        self.assertEqual(lineprotocol.escapekey('Kitchen,Plug'), 'Kitchen\\,Plug')
+        self.assertEqual(lineprotocol.escapekey('a=b'), 'a\\=b')
+        self.assertEqual(lineprotocol.escapekey('two\nlines'), 'two\\nlines')
+        self.assertEqual(lineprotocol.escapekey('Say "Hi"'), 'Say\\ "Hi"') # quotes are literal in keys
+        self.assertEqual(lineprotocol.escapekey(12), '12')
+
+    def test_escapename(self):
+        # equal signs are literal in measurement names
+        self.assertEqual(lineprotocol.escapename('Fritz Box,a=b'), 'Fritz\\ Box\\,a=b')
+
+    def test_formatstring(self):
+        self.assertEqual(lineprotocol.formatstring('NewYork'), '"NewYork"')
+        self.assertEqual(lineprotocol.formatstring('Living Room'), '"Living Room"')
+        self.assertEqual(lineprotocol.formatstring('Kitchen,Plug=1'), '"Kitchen,Plug=1"')
+        self.assertEqual(lineprotocol.formatstring('Say "Hi"'), '"Say \\"Hi\\""')
+        self.assertEqual(lineprotocol.formatstring('back\\slash'), '"back\\\\slash"')
+        self.assertEqual(lineprotocol.formatstring('two\nlines'), '"two\\nlines"')
+
+
+class FieldTest(unittest.TestCase):
+    def test_integer(self):
+        self.assertEqual(lineprotocol.field('UpTime', 12345, INTEGER), 'UpTime=12345i')
+        self.assertEqual(lineprotocol.field('UpTime', '12345', INTEGER), 'UpTime=12345i')
+        self.assertIsNone(lineprotocol.field('UpTime', 'n/a', INTEGER))
+        self.assertIsNone(lineprotocol.field('UpTime', None, INTEGER))
+
+    def test_float(self):
+        self.assertEqual(lineprotocol.field('Rate', 1.5, FLOAT), 'Rate=1.5')
+        self.assertEqual(lineprotocol.field('Rate', 3, FLOAT), 'Rate=3')
+        self.assertEqual(lineprotocol.field('Total', '123456789012345678901', FLOAT), 'Total=123456789012345678901')
+        self.assertIsNone(lineprotocol.field('Rate', 'nan', FLOAT))
+        self.assertIsNone(lineprotocol.field('Rate', 'inf', FLOAT))
+        self.assertIsNone(lineprotocol.field('Rate', '', FLOAT))
+
+    def test_boolean(self):
+        self.assertEqual(lineprotocol.field('Active', '1', BOOLEAN), 'Active=true')
+        self.assertEqual(lineprotocol.field('Active', False, BOOLEAN), 'Active=false')
+
+    def test_string(self):
+        self.assertEqual(lineprotocol.field('SSID', 'NewYork', STRING), 'SSID="NewYork"')
+        self.assertEqual(lineprotocol.field('My SSID', 'a,b', STRING), 'My\\ SSID="a,b"')
+
+
+class LineTest(unittest.TestCase):
+    def test_line(self):
+        fields = [lineprotocol.field('Power', 100, INTEGER), lineprotocol.field('Name', 'Living Room', STRING)]
+        self.assertEqual(lineprotocol.line('FritzBoxSmartHome', (('source', 'Living Room'),), fields),
+                         'FritzBoxSmartHome,source=Living\\ Room Power=100i,Name="Living Room"')
+
+    def test_tags(self):
+        # tags without value are left out
+        line = lineprotocol.line('FritzBox', (('host', ''), ('box', None), ('source', 'wlan_2.4GHz')), ['SSID="NewYork"'])
+        self.assertEqual(line, 'FritzBox,source=wlan_2.4GHz SSID="NewYork"')
+
+    def test_tricky_tags(self):
+        line = lineprotocol.line('FritzBox', (('source', 'Kitchen,Plug a=b'),), ['x=1i'])
+        self.assertEqual(line, 'FritzBox,source=Kitchen\\,Plug\\ a\\=b x=1i')
+
+    def test_no_fields(self):
+        self.assertEqual(lineprotocol.line('FritzBox', (('source', 'dsl'),), [None, None]), '')
+
+    def test_timestamp(self):
+        self.assertEqual(lineprotocol.line('FritzBox', (), ['x=1i'], 1700000000), 'FritzBox x=1i 1700000000000000000')
+
+
+class ParseFieldTest(unittest.TestCase):
+    def test_roundtrip(self):
+        for name in TRICKY_NAMES:
+            if '\\' in name:
+                continue # backslashes are not escaped in field names by the line protocol
+            with self.subTest(name=name):
+                self.assertEqual(lineprotocol.parsefield(lineprotocol.field(name, name, STRING)), (name, name))
+                self.assertEqual(lineprotocol.parsefield(lineprotocol.field(name, 42, INTEGER)), (name, 42))
+
+    def test_roundtrip_values(self):
+        for value in TRICKY_NAMES:
+            with self.subTest(value=value):
+                self.assertEqual(lineprotocol.parsefield(lineprotocol.field('SSID', value, STRING)), ('SSID', value))
+
+    def test_types(self):
+        self.assertEqual(lineprotocol.parsefield('UpTime=12345i'), ('UpTime', 12345))
+        self.assertEqual(lineprotocol.parsefield('Rate=1.5'), ('Rate', 1.5))
+        self.assertEqual(lineprotocol.parsefield('Active=true'), ('Active', True))
+        self.assertEqual(lineprotocol.parsefield('SSID="NewYork"'), ('SSID', 'NewYork'))
+        self.assertEqual(lineprotocol.parsefield('SSID="true"'), ('SSID', 'true'))
+
+
+if __name__ == '__main__':
+    unittest.main()
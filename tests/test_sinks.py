@@ -0,0 +1,160 @@
+# Tests of the InfluxDB and Prometheus outputs against a local HTTP stand-in.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Run with:
+# python3 -m pytest tests
+
+import io
+import gzip
+import threading
+import unittest
+import contextlib
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from fritzcollector import sinks
+
+
+# Stand-in for InfluxDB: keeps every write request and answers with the next status of its list, 204 when it is empty
+class InfluxStandIn(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        url = urlsplit(self.path)
+        self.server.requests.append({'path': url.path, 'params': parse_qs(url.query), 'headers': self.headers,
+                                     'lines': gzip.decompress(body).decode().splitlines()})
+        status = self.server.statuses.pop(0) if self.server.statuses else 204
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def points(first, last):
+    # Points with the numbers first to last-1, with a timestamp so the lines do not depend on the time of writing
+    return [('FritzBox', (('source', 'wan'),), ['n=%di' % n], 1700000000 + n) for n in range(first, last)]
+
+def numbers(lines):
+    return [int(line.split('n=')[1].split('i')[0]) for line in lines]
+
+
+class InfluxSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), InfluxStandIn)
+        self.server.requests = []
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.stderr = contextlib.redirect_stderr(io.StringIO()) # the sink reports failed writes to stderr
+        self.stderr.__enter__()
+
+    def tearDown(self):
+        self.stderr.__exit__(None, None, None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sent(self):
+        return [numbers(request['lines']) for request in self.server.requests]
+
+    def test_v1(self):
+        sink = sinks.InfluxSink(self.url + '/', database='telegraf', user='telegraf', password='secret', batchSize=2)
+        sink.write(points(0, 5))
+        self.assertEqual(self.sent(), [[0, 1], [2, 3], [4]])
+        request = self.server.requests[0]
+        self.assertEqual(request['path'], '/write')
+        self.assertEqual(request['params'], {'db': ['telegraf'], 'precision': ['ns']})
+        self.assertEqual(request['headers']['Content-Encoding'], 'gzip')
+        self.assertTrue(request['headers']['Authorization'].startswith('Basic '))
+        self.assertEqual(request['lines'][0], 'FritzBox,source=wan n=0i 1700000000000000000')
+        self.assertEqual(len(sink.buffer), 0)
+
+    def test_v2(self):
+        sink = sinks.InfluxSink(self.url, token='TOKEN', org='home', bucket='fritz')
+        sink.write(points(0, 3))
+        self.assertEqual(self.sent(), [[0, 1, 2]])
+        request = self.server.requests[0]
+        self.assertEqual(request['path'], '/api/v2/write')
+        self.assertEqual(request['params'], {'org': ['home'], 'bucket': ['fritz'], 'precision': ['ns']})
+        self.assertEqual(request['headers']['Authorization'], 'Token TOKEN')
+        self.assertEqual(request['headers']['Content-Encoding'], 'gzip')
+
+    def test_retry(self):
+        for status in (503, 429):
+            with self.subTest(status=status):
+                self.server.requests = []
+                self.server.statuses = [status]
+                sink = sinks.InfluxSink(self.url, database='telegraf')
+                sink.write(points(0, 2))
+                self.assertEqual(list(numbers(sink.buffer)), [0, 1]) # kept for the next write
+                sink.write(points(2, 3))
+                self.assertEqual(self.sent(), [[0, 1], [0, 1, 2]])
+                self.assertEqual(len(sink.buffer), 0)
+
+    def test_refused(self):
+        self.server.statuses = [400]
+        sink = sinks.InfluxSink(self.url, database='telegraf')
+        sink.write(points(0, 2))
+        self.assertEqual(len(sink.buffer), 0) # would be refused again
+        sink.write(points(2, 3))
+        self.assertEqual(self.sent(), [[0, 1], [2]])
+
+    def test_buffer_size(self):
+        self.server.statuses = [503, 503]
+        sink = sinks.InfluxSink(self.url, database='telegraf', bufferSize=3)
+        sink.write(points(0, 2))
+        sink.write(points(2, 5))
+        self.assertEqual(list(numbers(sink.buffer)), [2, 3, 4]) # the oldest are dropped first
+        sink.close()
+        self.assertEqual(self.sent()[-1], [2, 3, 4])
+        self.assertEqual(len(sink.buffer), 0)
+
+    def test_unreachable(self):
+        sink = sinks.InfluxSink('http://127.0.0.1:1', database='telegraf', timeout=1)
+        sink.write(points(0, 2))
+        self.assertEqual(list(numbers(sink.buffer)), [0, 1])
+
+
+class PrometheusSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.sink = sinks.PrometheusSink(0, '127.0.0.1')
+        self.url = 'http://127.0.0.1:%d' % self.sink.server.server_address[1]
+
+    def tearDown(self):
+        self.sink.close()
+        self.sink.server.server_close()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.read().decode()
+
+    def test_metrics(self):
+        self.sink.write([
+            ('FritzBox', (('host', 'fritz.box'), ('source', 'wlan_2.4GHz')), ['SSID="NewYork"', 'Channel=6i', 'Rate=1.5'], None),
+            ('FritzBoxSmartHome', (('source', 'Say "Hi"\\\n'), ('box', '')), ['Power=100i', 'Active=true'], None),
+            ('FritzBoxSmartHome', (('source', 'Plug'),), ['Power=200i'], 1700000000), # history
+        ])
+        lines = self.get('/metrics').splitlines()
+        self.assertIn('# TYPE FritzBox_Channel gauge', lines)
+        self.assertIn('FritzBox_Channel{host="fritz.box",source="wlan_2.4GHz"} 6.0', lines)
+        self.assertIn('FritzBox_Rate{host="fritz.box",source="wlan_2.4GHz"} 1.5', lines)
+        self.assertIn('FritzBoxSmartHome_Power{source="Say \\"Hi\\"\\\\\\n"} 100.0', lines)
+        self.assertIn('FritzBoxSmartHome_Active{source="Say \\"Hi\\"\\\\\\n"} 1.0', lines)
+        self.assertFalse([line for line in lines if 'SSID' in line]) # Prometheus only has numbers
+        self.assertFalse([line for line in lines if 'Plug' in line]) # only the current values
+
+    def test_empty(self):
+        self.assertEqual(self.get('/metrics'), '')
+
+    def test_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self.get('/other')
+        self.assertEqual(error.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
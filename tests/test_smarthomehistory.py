@@ -0,0 +1,80 @@
+# Tests of the smarthome history collector over several polls of a replayed box.
+# https://github.com/Schmidsfeld/TelegrafFritzBox
+# License: MIT (https://opensource.org/licenses/MIT)
+# Author: Alexander von Schmidsfeld
+
+# Run with:
+# python3 -m pytest tests
+
+import unittest
+
+from fritzcollector import replay, lineprotocol
+from fritzcollector.box import FritzBox
+from fritzcollector.collectors import COLLECTORS
+
+
+DATATIME = 1700000000 # time of the newest values in the example fixture, not aligned to any grid
+STATS_KEY = '/webservices/homeautoswitch.lua?ain=11657 0000000&switchcmd=getbasicdevicestats'
+GRIDS = {'Power': 10, 'Temperature': 900, 'EnergyDelta': 86400}
+
+
+class SmartHomeHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.fixture = replay.examplefixture(hosts=1, devices=1, clients=0)
+        self.document = self.fixture['documents'][STATS_KEY]
+        self.box = FritzBox('replay', 'replay')
+        self.box.fc = replay.ReplayConnection(self.fixture)
+        self.box.detectuplink()
+
+    def poll(self, datatime):
+        # Timestamps of the points of one poll by field name
+        self.fixture['documents'][STATS_KEY] = self.document.replace('datatime="%d"' % DATATIME, 'datatime="%d"' % datatime)
+        self.box.run([COLLECTORS['smarthomehistory']])
+        self.assertEqual(self.box.error, '')
+        timestamps = dict()
+        for measurement, tags, fields, timestamp in self.box.points:
+            for field in fields:
+                name = lineprotocol.parsefield(field)[0]
+                timestamps.setdefault(name, []).append(timestamp)
+        return timestamps
+
+    def test_first_poll(self):
+        timestamps = self.poll(DATATIME)
+        self.assertEqual(len(timestamps['Power']), 360)
+        self.assertEqual(len(timestamps['Temperature']), 96)
+        self.assertEqual(len(timestamps['EnergyDelta']), 31)
+        for name, grid in GRIDS.items():
+            self.assertTrue(all(timestamp % grid == 0 for timestamp in timestamps[name]), name)
+            self.assertEqual(max(timestamps[name]), DATATIME // grid * grid) # the running interval
+
+    def test_running_interval(self):
+        first = self.poll(DATATIME)
+        second = self.poll(DATATIME + 10)
+        # only the running day and quarter hour again, at the same time
+        self.assertEqual(second['EnergyDelta'], [DATATIME // 86400 * 86400])
+        self.assertEqual(second['Temperature'], [DATATIME // 900 * 900])
+        # the power interval that was running is complete now, and a new one started
+        self.assertEqual(sorted(second['Power']), [DATATIME // 10 * 10, DATATIME // 10 * 10 + 10])
+        self.assertTrue(set(second['EnergyDelta']) <= set(first['EnergyDelta']))
+
+    def test_completed_interval(self):
+        self.poll(DATATIME)
+        self.poll(DATATIME + 10)
+        quarter = DATATIME // 900 * 900
+        third = self.poll(quarter + 900 + 5)
+        self.assertEqual(sorted(third['Temperature']), [quarter, quarter + 900])
+        self.assertEqual(third['EnergyDelta'], [DATATIME // 86400 * 86400])
+        fourth = self.poll(quarter + 900 + 5)
+        self.assertEqual(fourth['Temperature'], [quarter + 900])
+
+    def test_without_datatime(self):
+        # older firmware: the values end at the poll, the running interval is written again at the same time
+        self.document = self.document.replace('datatime="%d"' % DATATIME, '')
+        first = self.poll(DATATIME)
+        second = self.poll(DATATIME)
+        self.assertEqual(second['EnergyDelta'], [max(first['EnergyDelta'])])
+        self.assertTrue(all(timestamp % 86400 == 0 for timestamp in first['EnergyDelta']))
+
+
+if __name__ == '__main__':
+    unittest.main()